@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from api.cache import auth_token_cache_key, cache_is_shared
+from foodgram.constants import AUTH_TOKEN_CACHE_TIMEOUT
+
+# Счётчики меняются запросами UPDATE без сигналов, поэтому в кэш
+# пользователь попадает без них: они дочитаются из базы при обращении,
+# а save() не перезапишет их устаревшими значениями.
+USER_COUNTER_FIELDS = ('user__recipes_count', 'user__subscribers_count')
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кэшем «токен → пользователь».
+
+    Пользователь хранится в кэше AUTH_TOKEN_CACHE_TIMEOUT секунд, и запрос
+    с известным токеном обходится без обращения к базе. Записи кэша
+    сбрасываются при удалении токена (выход) и при любом сохранении
+    пользователя: смене пароля, блокировке, изменении профиля и аватара.
+    Кэш используется, только если он общий для всех процессов: в кэше
+    памяти процесса сброс в одном воркере не дошёл бы до остальных, и
+    вышедший или заблокированный пользователь оставался бы в них
+    авторизованным до истечения записи.
+    """
+
+    def authenticate_credentials(self, key):
+        if not cache_is_shared():
+            return super().authenticate_credentials(key)
+        cache_key = auth_token_cache_key(key)
+        user = cache.get(cache_key)
+        if user is not None:
+            return user, self.get_model()(key=key, user=user)
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user').defer(
+                *USER_COUNTER_FIELDS,
+            ).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        cache.set(cache_key, token.user, AUTH_TOKEN_CACHE_TIMEOUT)
+        return token.user, token
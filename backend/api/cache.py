@@ -0,0 +1,116 @@
+from hashlib import md5
+from uuid import uuid4
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from recipes.models import Tag
+
+RECIPE_CACHE_KEY = 'recipe-representation:{}'
+DATA_VERSION_KEY = 'data-version:{}'
+AUTH_TOKEN_KEY = 'auth-token:{}'
+PER_PROCESS_CACHES = (DummyCache, LocMemCache)
+
+_tag_ids = {'version': None, 'by_slug': {}}
+
+
+def cache_is_shared():
+    """
+    Общий ли кэш для всех процессов.
+
+    Версии наборов данных видны всем воркерам gunicorn только в общем
+    кэше: файловом, memcached или Redis. В кэше памяти процесса смену
+    версии в одном воркере остальные не заметят, поэтому ETag и кэши
+    в памяти процесса, зависящие от версий, тогда не используются.
+    """
+    return not isinstance(caches['default'], PER_PROCESS_CACHES)
+
+
+def recipe_cache_key(recipe_id):
+    """Ключ кэша представления рецепта, не зависящего от пользователя."""
+    return RECIPE_CACHE_KEY.format(recipe_id)
+
+
+def drop_recipes(recipe_ids):
+    """Удаляет кэшированные представления рецептов без учёта транзакции."""
+    cache.delete_many([
+        recipe_cache_key(recipe_id) for recipe_id in recipe_ids
+    ])
+
+
+def invalidate_recipes(recipe_ids):
+    """
+    Сбрасывает кэшированные представления рецептов.
+
+    Ключи удаляются сразу и повторно после коммита транзакции, чтобы
+    параллельный запрос не успел закэшировать незафиксированное состояние.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    drop_recipes(recipe_ids)
+    transaction.on_commit(lambda: drop_recipes(recipe_ids))
+
+
+def auth_token_cache_key(key):
+    """Ключ кэша пользователя, которому принадлежит токен."""
+    return AUTH_TOKEN_KEY.format(key)
+
+
+def invalidate_auth_tokens(keys):
+    """Сбрасывает кэш токенов сразу и повторно после коммита транзакции."""
+    cache_keys = [auth_token_cache_key(key) for key in keys]
+    if not cache_keys:
+        return
+    cache.delete_many(cache_keys)
+    transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+def get_data_version(name):
+    """Текущая версия набора справочных данных."""
+    key = DATA_VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_version(name):
+    """Меняет версию набора данных сразу и после коммита транзакции."""
+    key = DATA_VERSION_KEY.format(name)
+    cache.set(key, uuid4().hex, None)
+    transaction.on_commit(lambda: cache.set(key, uuid4().hex, None))
+
+
+def data_version_etag(name):
+    """
+    Функция ETag для django.views.decorators.http.condition.
+
+    ETag меняется вместе с версией набора данных и зависит от пути
+    с параметрами запроса. Без общего кэша ETag не выдаётся.
+    """
+    def etag_func(request, *args, **kwargs):
+        if not cache_is_shared():
+            return None
+        path_hash = md5(request.get_full_path().encode()).hexdigest()
+        return f'{get_data_version(name)}-{path_hash}'
+    return etag_func
+
+
+def get_tag_ids_by_slug():
+    """
+    Соответствие слагов тегов их id.
+
+    Хранится в памяти процесса и перечитывается из базы только после
+    смены версии тегов. Без общего кэша читается из базы каждый раз.
+    """
+    if not cache_is_shared():
+        return dict(Tag.objects.values_list('slug', 'id'))
+    version = get_data_version('tags')
+    if _tag_ids['version'] != version:
+        _tag_ids['by_slug'] = dict(Tag.objects.values_list('slug', 'id'))
+        _tag_ids['version'] = version
+    return _tag_ids['by_slug']
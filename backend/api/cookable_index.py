@@ -0,0 +1,136 @@
+from array import array
+from bisect import insort
+from collections import Counter, defaultdict
+from heapq import nlargest
+from threading import Lock
+from time import monotonic
+
+from api.cache import get_data_version
+from foodgram.constants import RECIPE_INGREDIENT_INDEX_TTL
+from recipes.models import RecipeIngredient
+
+
+class CookableIndex:
+    """
+    Обратный индекс «ингредиент → рецепты» в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id рецептов,
+    для каждого рецепта — число его ингредиентов. Новые строки
+    RecipeIngredient дочитываются по возрастанию id при каждом запросе,
+    после удаления строк (версия 'recipe-ingredients') и не реже раза в
+    RECIPE_INGREDIENT_INDEX_TTL секунд индекс строится заново.
+
+    Новый индекс строится без блокировки поиска одним потоком, остальные
+    запросы тем временем отвечают по прежнему; готовый индекс подменяет
+    старый целиком. Ждут построения только запросы к ещё пустому индексу.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.build_lock = Lock()
+        self.version = None
+        self.built_at = None
+        self.last_row_id = 0
+        self.postings = {}
+        self.sizes = Counter()
+
+    def _add(self, rows):
+        for row_id, recipe_id, ingredient_id in rows:
+            # Строки могли уже дочитать параллельный запрос или перестройка.
+            if row_id <= self.last_row_id:
+                continue
+            posting = self.postings.get(ingredient_id)
+            if posting is None:
+                posting = self.postings[ingredient_id] = array('q')
+            if not posting or posting[-1] < recipe_id:
+                posting.append(recipe_id)
+            else:
+                insort(posting, recipe_id)
+            self.sizes[recipe_id] += 1
+            self.last_row_id = row_id
+
+    def _is_stale(self, version):
+        return (
+            self.built_at is None
+            or self.version != version
+            or monotonic() - self.built_at >= RECIPE_INGREDIENT_INDEX_TTL
+        )
+
+    def _rebuild(self, version):
+        if not self.build_lock.acquire(blocking=self.built_at is None):
+            return
+        try:
+            with self.lock:
+                if not self._is_stale(version):
+                    return
+            postings = defaultdict(list)
+            sizes = Counter()
+            last_row_id = 0
+            for row_id, recipe_id, ingredient_id in (
+                RecipeIngredient.objects.order_by()
+                .values_list('pk', 'recipe_id', 'ingredient_id')
+                .iterator()
+            ):
+                postings[ingredient_id].append(recipe_id)
+                sizes[recipe_id] += 1
+                last_row_id = max(last_row_id, row_id)
+            postings = {
+                ingredient_id: array('q', sorted(recipe_ids))
+                for ingredient_id, recipe_ids in postings.items()
+            }
+            with self.lock:
+                self.postings = postings
+                self.sizes = sizes
+                self.last_row_id = last_row_id
+                self.version = version
+                self.built_at = monotonic()
+        finally:
+            self.build_lock.release()
+
+    def refresh(self):
+        version = get_data_version('recipe-ingredients')
+        with self.lock:
+            stale = self._is_stale(version)
+            last_row_id = self.last_row_id
+        if stale:
+            self._rebuild(version)
+            return
+        rows = list(
+            RecipeIngredient.objects
+            .filter(pk__gt=last_row_id)
+            .order_by('pk')
+            .values_list('pk', 'recipe_id', 'ingredient_id')
+        )
+        if rows:
+            with self.lock:
+                self._add(rows)
+
+    def search(self, ingredient_ids, limit, max_missing=None):
+        """
+        Лучшие рецепты для набора ингредиентов.
+
+        Возвращает список (id рецепта, найдено, не хватает), отсортированный
+        по доле ингредиентов рецепта, которые есть у пользователя, затем
+        по числу недостающих, затем от новых к старым.
+        """
+        self.refresh()
+        with self.lock:
+            matched = Counter()
+            for ingredient_id in set(ingredient_ids):
+                matched.update(self.postings.get(ingredient_id, ()))
+            sizes = self.sizes
+            candidates = (
+                (count / sizes[recipe_id], count - sizes[recipe_id],
+                 count, recipe_id)
+                for recipe_id, count in matched.items()
+                if max_missing is None
+                or sizes[recipe_id] - count <= max_missing
+            )
+            return [
+                (recipe_id, count, -negative_missing)
+                for _, negative_missing, count, recipe_id
+                in nlargest(limit, candidates)
+            ]
+
+
+cookable_index = CookableIndex()
@@ -0,0 +1,49 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from recipes.models import FeedEntry
+
+logger = logging.getLogger(__name__)
+
+_executor = {'pool': None}
+
+
+def _fan_out(recipe_id):
+    try:
+        FeedEntry.objects.fan_out(recipe_id)
+    except Exception:
+        logger.exception('Не удалось разослать рецепт %s в ленты', recipe_id)
+
+
+def _fan_out_in_thread(recipe_id):
+    try:
+        _fan_out(recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_fan_out(recipe_id):
+    """
+    Ставит рассылку нового рецепта в ленты подписчиков в фоновый пул
+    после коммита.
+
+    Очередь живёт в памяти процесса: если воркер упадёт или
+    перезапустится до конца рассылки, часть подписчиков не получит
+    рецепт в ленту. При FEED_FANOUT_WORKERS = 0 рецепт рассылается
+    сразу после коммита в том же запросе.
+    """
+    def submit():
+        if not settings.FEED_FANOUT_WORKERS:
+            _fan_out(recipe_id)
+            return
+        if _executor['pool'] is None:
+            _executor['pool'] = ThreadPoolExecutor(
+                max_workers=settings.FEED_FANOUT_WORKERS,
+                thread_name_prefix='feed-fan-out',
+            )
+        _executor['pool'].submit(_fan_out_in_thread, recipe_id)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,172 @@
+import base64
+import binascii
+import os
+import tempfile
+import uuid
+import weakref
+from contextlib import suppress
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.fields import ImageField
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+from foodgram.constants import (IMAGE_DECODE_CHUNK_SIZE, IMAGE_MAX_PIXELS,
+                                IMAGE_MAX_UPLOAD_SIZE)
+
+
+def remove_file(path):
+    with suppress(FileNotFoundError):
+        os.remove(path)
+
+
+class Base64UploadedFile(TemporaryUploadedFile):
+    """
+    Временный файл с декодированной картинкой.
+
+    Хранилище перемещает его на место при сохранении модели, а если
+    этого не произошло, файл удаляется вместе с объектом.
+    """
+
+    def __init__(self, name):
+        file = tempfile.NamedTemporaryFile(
+            suffix='.upload',
+            dir=settings.FILE_UPLOAD_TEMP_DIR,
+            delete=False,
+        )
+        UploadedFile.__init__(self, file, name, None, 0, None)
+        weakref.finalize(self, remove_file, file.name)
+
+
+class StreamingBase64ImageField(Base64ImageField):
+    """
+    Картинка в base64, декодируемая частями во временный файл.
+
+    Размер проверяется по длине строки до декодирования, размер в
+    пикселях — по заголовку картинки до загрузки её в память.
+    """
+
+    default_error_messages = {
+        'too_large': (
+            'Размер картинки не должен превышать {max_size} байт.'
+        ),
+        'too_many_pixels': (
+            'Картинка не должна содержать больше {max_pixels} пикселей.'
+        ),
+    }
+
+    def decode(self, base64_data):
+        """
+        Декодирует строку частями во временный файл.
+
+        Пробелы и переводы строк отбрасываются, а символы, не добравшие
+        до группы из четырёх, переносятся в следующую часть.
+        """
+        upload = Base64UploadedFile(str(uuid.uuid4()))
+        pending = ''
+        try:
+            for start in range(
+                0,
+                len(base64_data),
+                IMAGE_DECODE_CHUNK_SIZE,
+            ):
+                pending += ''.join(
+                    base64_data[start:start + IMAGE_DECODE_CHUNK_SIZE].split()
+                )
+                ready = len(pending) - len(pending) % 4
+                upload.write(base64.b64decode(pending[:ready]))
+                pending = pending[ready:]
+            upload.write(base64.b64decode(pending))
+        except (TypeError, binascii.Error, ValueError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        upload.size = upload.tell()
+        upload.seek(0)
+        return upload
+
+    def get_extension(self, upload):
+        """Расширение по заголовку картинки с проверкой её размеров."""
+        try:
+            with Image.open(upload) as image:
+                extension = image.format.lower()
+                width, height = image.size
+        except (OSError, AttributeError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        extension = 'jpg' if extension == 'jpeg' else extension
+        if extension not in self.ALLOWED_TYPES:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        if width * height > IMAGE_MAX_PIXELS:
+            self.fail('too_many_pixels', max_pixels=IMAGE_MAX_PIXELS)
+        upload.seek(0)
+        return extension
+
+    def to_internal_value(self, base64_data):
+        if base64_data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(base64_data, str):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        if ';base64,' in base64_data:
+            base64_data = base64_data.split(';base64,', 1)[1]
+        if len(base64_data) * 3 // 4 > IMAGE_MAX_UPLOAD_SIZE:
+            self.fail('too_large', max_size=IMAGE_MAX_UPLOAD_SIZE)
+
+        upload = self.decode(base64_data)
+        upload.name = f'{upload.name}.{self.get_extension(upload)}'
+        return ImageField.to_internal_value(self, upload)
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Первичный ключ, объект которого берётся из заранее загруженных.
+
+    Список, в котором стоит поле, вызывает preload() со всеми ключами
+    запроса, и объекты достаются одним запросом IN вместо запроса на
+    каждый ключ. Сообщения об ошибках остаются прежними.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.preloaded = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return PreloadedManyRelatedField(**list_kwargs)
+
+    def to_key(self, value):
+        if isinstance(value, bool):
+            raise DjangoValidationError('Недопустимый тип ключа.')
+        return self.get_queryset().model._meta.pk.to_python(value)
+
+    def preload(self, values):
+        keys = set()
+        for value in values:
+            with suppress(DjangoValidationError):
+                keys.add(self.to_key(value))
+        self.preloaded = self.get_queryset().in_bulk(keys)
+
+    def to_internal_value(self, data):
+        if self.preloaded is None:
+            return super().to_internal_value(data)
+        try:
+            key = self.to_key(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if key not in self.preloaded:
+            self.fail('does_not_exist', pk_value=data)
+        return self.preloaded[key]
+
+
+class PreloadedManyRelatedField(ManyRelatedField):
+    """Список первичных ключей, загружаемых одним запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.child_relation.preload(data)
+        return super().to_internal_value(data)
@@ -1,16 +1,22 @@
-from django_filters.rest_framework import (AllValuesMultipleFilter,
-                                           BooleanFilter, CharFilter,
-                                           FilterSet)
+from django.db.models import Count, Exists, OuterRef
+from django.db.models.functions import Lower
+from django_filters.rest_framework import (BooleanFilter, CharFilter,
+                                           FilterSet, MultipleChoiceFilter)
 
+from api.cache import get_tag_ids_by_slug
 from recipes.models import Ingredient, Recipe
+from recipes.search import search_recipes
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_ids_by_slug()]
 
 
 class IngredientFilter(FilterSet):
     """Фильтр для поиска ингредиентов."""
 
     name = CharFilter(
-        field_name='name',
-        lookup_expr='istartswith',
+        method='filter_name',
         help_text='Название ингредиента (по начальным буквам)',
     )
 
@@ -18,12 +24,26 @@ class IngredientFilter(FilterSet):
         model = Ingredient
         fields = ['name']
 
+    def filter_name(self, queryset, name, value):
+        """
+        Поиск по индексу lower(name) с ранжированием по популярности.
+
+        Используется, когда индекс ингредиентов в памяти отключён.
+        """
+        return queryset.annotate(
+            lower_name=Lower('name'),
+            uses=Count('recipe_ingredients'),
+        ).filter(
+            lower_name__startswith=value.lower(),
+        ).order_by('-uses', 'lower_name')
+
 
 class RecipeFilter(FilterSet):
     """Фильтр для рецептов."""
 
-    tags = AllValuesMultipleFilter(
-        field_name='tags__slug',
+    tags = MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags',
         help_text='Фильтрация по слагам тегов',
     )
     is_favorited = BooleanFilter(
@@ -34,6 +54,10 @@ class RecipeFilter(FilterSet):
         field_name='is_in_shopping_cart',
         help_text='Фильтр по корзине',
     )
+    search = CharFilter(
+        method='filter_search',
+        help_text='Поиск по названию и описанию',
+    )
 
     class Meta:
         model = Recipe
@@ -42,8 +66,35 @@ class RecipeFilter(FilterSet):
             'author',
             'is_favorited',
             'is_in_shopping_cart',
+            'search',
         ]
 
+    def filter_tags(self, queryset, name, value):
+        """
+        Рецепты хотя бы с одним из тегов, без JOIN и DISTINCT.
+
+        Слаг мог пройти проверку, а затем пропасть из соответствия, если
+        тег удалили или переименовали между ними: такие слаги отбрасываются.
+        """
+        tag_ids_by_slug = get_tag_ids_by_slug()
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'),
+                tag_id__in=[
+                    tag_ids_by_slug[slug] for slug in value
+                    if slug in tag_ids_by_slug
+                ],
+            )
+        ))
+
+    def filter_search(self, queryset, name, value):
+        """
+        Полнотекстовый поиск с сортировкой по релевантности.
+
+        В режиме курсора пагинация сортирует результаты по дате.
+        """
+        return search_recipes(queryset, value)
+
     def filter_queryset(self, queryset):
         """Отключение фильтров для анонимных пользователей."""
         if not self.request.user.is_authenticated:
@@ -0,0 +1,125 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from foodgram.constants import IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_QUALITY
+
+logger = logging.getLogger(__name__)
+
+_executor = {'pool': None}
+
+
+def variant_name(name, variant, extension):
+    """Путь уменьшенной копии картинки рядом с оригиналом."""
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(
+        directory,
+        'variants',
+        f'{stem}_{variant}.{extension}',
+    )
+
+
+def variant_names(name, sizes):
+    """Все пути копий в порядке их создания."""
+    return [
+        variant_name(name, variant, extension)
+        for variant in sizes
+        for extension in IMAGE_VARIANT_FORMATS
+    ]
+
+
+def variant_urls(field_file, sizes, ready_for):
+    """
+    Ссылки на копии картинки вида {вариант: {формат: url}}.
+
+    ready_for — путь картинки, для которой копии уже созданы; его
+    записывают в модель по окончании создания, поэтому хранилище при
+    сериализации не опрашивается. Пока копии не готовы, возвращается
+    пустой словарь и клиент использует оригинал.
+    """
+    if not field_file or field_file.name != ready_for:
+        return {}
+    storage = field_file.storage
+    return {
+        variant: {
+            extension: storage.url(
+                variant_name(field_file.name, variant, extension)
+            )
+            for extension in IMAGE_VARIANT_FORMATS
+        }
+        for variant in sizes
+    }
+
+
+def generate_variants(name, sizes):
+    """Создаёт недостающие копии картинки для каждого размера и формата."""
+    if all(
+        default_storage.exists(path) for path in variant_names(name, sizes)
+    ):
+        return
+    with default_storage.open(name, 'rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+
+    for variant, size in sizes.items():
+        image = original.copy()
+        image.thumbnail(size, Image.LANCZOS)
+        for extension, image_format in IMAGE_VARIANT_FORMATS.items():
+            path = variant_name(name, variant, extension)
+            if default_storage.exists(path):
+                continue
+            if image_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+                converted = image.convert(
+                    'RGB' if image_format == 'JPEG' else 'RGBA'
+                )
+            else:
+                converted = image
+            buffer = BytesIO()
+            converted.save(
+                buffer,
+                image_format,
+                quality=IMAGE_VARIANT_QUALITY,
+            )
+            default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def _process(name, sizes, on_done):
+    try:
+        generate_variants(name, sizes)
+        if on_done:
+            on_done(name)
+    except Exception:
+        logger.exception('Не удалось создать копии картинки %s', name)
+
+
+def schedule_variants(field_file, sizes, on_done=None):
+    """
+    Ставит создание копий картинки в фоновый пул после коммита.
+
+    Когда все копии есть, вызывается on_done(путь картинки). При
+    IMAGE_VARIANT_WORKERS = 0 копии создаются сразу.
+    """
+    if not field_file:
+        return
+    name = field_file.name
+
+    def submit():
+        if not settings.IMAGE_VARIANT_WORKERS:
+            _process(name, sizes, on_done)
+            return
+        if _executor['pool'] is None:
+            _executor['pool'] = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                thread_name_prefix='image-variants',
+            )
+        _executor['pool'].submit(_process, name, sizes, on_done)
+
+    transaction.on_commit(submit)
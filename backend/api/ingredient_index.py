@@ -0,0 +1,78 @@
+from bisect import bisect_left
+from time import monotonic
+
+from django.db.models import Count
+
+from api.cache import get_data_version
+from foodgram.constants import INGREDIENT_INDEX_TTL
+from recipes.models import Ingredient, RecipeIngredient
+
+PREFIX_END = chr(0x10FFFF)
+
+
+class IngredientPrefixIndex:
+    """
+    Индекс названий ингредиентов в памяти процесса.
+
+    Названия хранятся отсортированными в нижнем регистре, поиск по
+    началу названия — двоичный. Найденные ингредиенты ранжируются по
+    числу рецептов, в которых они встречаются, затем по алфавиту.
+    Индекс перестраивается после изменения ингредиентов, а популярность
+    обновляется не реже раза в INGREDIENT_INDEX_TTL секунд.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.built_at = None
+        self.index = ([], [])
+
+    def refresh(self):
+        version = get_data_version('ingredients')
+        if (
+            self.version == version
+            and monotonic() - self.built_at < INGREDIENT_INDEX_TTL
+        ):
+            return
+
+        uses = dict(
+            RecipeIngredient.objects.order_by()
+            .values('ingredient')
+            .annotate(total=Count('pk'))
+            .values_list('ingredient', 'total')
+        )
+        entries = sorted(
+            (
+                ingredient['name'].lower(),
+                (-uses.get(ingredient['id'], 0), ingredient['name'].lower()),
+                ingredient,
+            )
+            for ingredient in Ingredient.objects.order_by().values(
+                'id',
+                'name',
+                'measurement_unit',
+            )
+        )
+        self.index = (
+            [name for name, _, _ in entries],
+            [(rank, ingredient) for _, rank, ingredient in entries],
+        )
+        self.version = version
+        self.built_at = monotonic()
+
+    def search(self, prefix):
+        """Ингредиенты, названия которых начинаются с prefix."""
+        self.refresh()
+        names, entries = self.index
+        prefix = prefix.lower()
+        start = bisect_left(names, prefix)
+        end = bisect_left(names, prefix + PREFIX_END, lo=start)
+        return [
+            dict(ingredient)
+            for _, ingredient in sorted(
+                entries[start:end],
+                key=lambda entry: entry[0],
+            )
+        ]
+
+
+ingredient_index = IngredientPrefixIndex()
@@ -0,0 +1,384 @@
+import fcntl
+import json
+import logging
+import os
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from threading import Lock
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from foodgram.constants import METRICS_FLUSH_INTERVAL, METRICS_LATENCY_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'foodgram'
+ARCHIVE_NAME = 'archive.json'
+ARCHIVE_LOCK_NAME = 'archive.lock'
+SUMMARIES = (
+    ('db_queries', 'db_queries', 'Число SQL-запросов за запрос.'),
+    ('db_seconds', 'db_duration_seconds', 'Время SQL-запросов, с.'),
+    (
+        'view_seconds',
+        'view_duration_seconds',
+        'Время работы представления, включая сериализаторы, с.',
+    ),
+    (
+        'serialization_seconds',
+        'serialization_duration_seconds',
+        'Время рендеринга ответа в JSON или другой формат, с.',
+    ),
+    ('response_bytes', 'response_size_bytes', 'Размер ответа, байт.'),
+)
+
+
+class RequestMetrics:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.view_started = None
+        self.render_started = None
+        self.duration = 0
+        self.db_queries = 0
+        self.db_seconds = 0
+        self.view_seconds = 0
+        self.serialization_seconds = 0
+        self.response_bytes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_seconds += perf_counter() - started
+
+    @contextmanager
+    def track_queries(self):
+        """Считает SQL-запросы всех подключений внутри блока."""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield
+
+    def view_finished(self):
+        if self.view_started is not None and not self.view_seconds:
+            self.view_seconds = perf_counter() - self.view_started
+
+    def render_finished(self, response):
+        self.serialization_seconds = perf_counter() - self.render_started
+
+    def finish(self):
+        self.view_finished()
+        self.duration = perf_counter() - self.started
+
+
+class MetricsRegistry:
+    """
+    Метрики процесса с агрегацией между воркерами gunicorn.
+
+    Каждый процесс копит метрики в памяти и не чаще раза в
+    METRICS_FLUSH_INTERVAL секунд сохраняет их в свой файл в METRICS_DIR.
+    Страница метрик складывает файлы всех процессов. Файлы завершившихся
+    воркеров прибавляются к общему архиву и удаляются, поэтому счётчики
+    не уменьшаются, а число файлов не растёт с перезапусками воркеров.
+    Живость процесса проверяется по pid, так что METRICS_DIR не должен
+    быть общим для нескольких контейнеров или серверов.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.pid = None
+        self.flushed_at = 0
+
+    def _path(self, pid):
+        return os.path.join(settings.METRICS_DIR, f'{pid}.json')
+
+    def _ensure_process(self):
+        """После fork начинает счёт заново со своего файла."""
+        pid = os.getpid()
+        if self.pid == pid:
+            return
+        self.pid = pid
+        self.endpoints = {}
+        self.responses = Counter()
+        stored = self._load(self._path(pid))
+        if stored:
+            self.endpoints = stored['endpoints']
+            self.responses.update(stored['responses'])
+
+    def _load(self, path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def record(self, view, method, status, metrics):
+        metrics.finish()
+        with self.lock:
+            self._ensure_process()
+            key = f'{view} {method}'
+            endpoint = self.endpoints.get(key)
+            if endpoint is None:
+                endpoint = self.endpoints[key] = {
+                    'buckets': [0] * (len(METRICS_LATENCY_BUCKETS) + 1),
+                    'count': 0,
+                    'duration': 0,
+                    **{name: 0 for name, _, _ in SUMMARIES},
+                }
+            endpoint['buckets'][
+                bisect_left(METRICS_LATENCY_BUCKETS, metrics.duration)
+            ] += 1
+            endpoint['count'] += 1
+            endpoint['duration'] += metrics.duration
+            for name, _, _ in SUMMARIES:
+                endpoint[name] += getattr(metrics, name)
+            self.responses[f'{key} {status}'] += 1
+            if monotonic() - self.flushed_at >= METRICS_FLUSH_INTERVAL:
+                self._flush()
+
+    def _flush(self):
+        self.flushed_at = monotonic()
+        path = self._path(self.pid)
+        try:
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            self._save(
+                path,
+                {'endpoints': self.endpoints, 'responses': self.responses},
+            )
+        except OSError:
+            logger.exception('Не удалось сохранить метрики в %s', path)
+
+    def _save(self, path, data):
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+        os.replace(f'{path}.tmp', path)
+
+    def _dead_pids(self):
+        pids = []
+        for name in os.listdir(settings.METRICS_DIR):
+            pid = name[:-len('.json')]
+            if (
+                name.endswith('.json')
+                and pid.isdigit()
+                and int(pid) != self.pid
+                and not process_alive(int(pid))
+            ):
+                pids.append(int(pid))
+        return pids
+
+    def _archive_dead(self):
+        """Прибавляет метрики завершившихся процессов к архиву."""
+        pids = self._dead_pids()
+        if not pids:
+            return
+        archive_path = os.path.join(settings.METRICS_DIR, ARCHIVE_NAME)
+        lock_path = os.path.join(settings.METRICS_DIR, ARCHIVE_LOCK_NAME)
+        try:
+            with open(lock_path, 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                archive = self._load(archive_path) or {
+                    'endpoints': {},
+                    'responses': {},
+                }
+                responses = Counter(archive['responses'])
+                archived = []
+                for pid in pids:
+                    # Файл мог уже забрать в архив другой процесс.
+                    stored = self._load(self._path(pid))
+                    if stored:
+                        add_metrics(archive['endpoints'], responses, stored)
+                        archived.append(self._path(pid))
+                archive['responses'] = responses
+                self._save(archive_path, archive)
+                for path in archived:
+                    os.remove(path)
+        except OSError:
+            logger.exception('Не удалось перенести метрики в %s', archive_path)
+
+    def collect(self):
+        """Метрики всех процессов, сложенные по представлениям."""
+        with self.lock:
+            self._ensure_process()
+            self._flush()
+        self._archive_dead()
+        endpoints = {}
+        responses = Counter()
+        for name in sorted(os.listdir(settings.METRICS_DIR)):
+            if not name.endswith('.json'):
+                continue
+            stored = self._load(os.path.join(settings.METRICS_DIR, name))
+            if stored:
+                add_metrics(endpoints, responses, stored)
+        return endpoints, responses
+
+
+registry = MetricsRegistry()
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def add_metrics(endpoints, responses, stored):
+    """Прибавляет сохранённые метрики процесса к общим."""
+    responses.update(stored['responses'])
+    for key, values in stored['endpoints'].items():
+        total = endpoints.get(key)
+        if total is None:
+            endpoints[key] = {
+                name: list(value) if isinstance(value, list) else value
+                for name, value in values.items()
+            }
+            continue
+        for name, value in values.items():
+            if isinstance(value, list):
+                total[name] = [
+                    first + second
+                    for first, second in zip(total[name], value)
+                ]
+            else:
+                total[name] += value
+
+
+def escape(value):
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def labels(**values):
+    return '{{{}}}'.format(','.join(
+        f'{name}="{escape(value)}"' for name, value in values.items()
+    ))
+
+
+def header(name, kind, text):
+    return [f'# HELP {PREFIX}_{name} {text}', f'# TYPE {PREFIX}_{name} {kind}']
+
+
+def render_metrics(endpoints, responses):
+    """Метрики в текстовом формате Prometheus."""
+    lines = header('http_requests_total', 'counter', 'Число запросов.')
+    for key, count in sorted(responses.items()):
+        view, method, status = key.split(' ')
+        lines.append(
+            f'{PREFIX}_http_requests_total'
+            f'{labels(view=view, method=method, status=status)} {count}'
+        )
+
+    endpoints = sorted(
+        (key.split(' '), values) for key, values in endpoints.items()
+    )
+    name = f'{PREFIX}_http_request_duration_seconds'
+    lines += header(
+        'http_request_duration_seconds',
+        'histogram',
+        'Время обработки запроса, с.',
+    )
+    for (view, method), values in endpoints:
+        cumulative = 0
+        for bound, count in zip(
+            (*METRICS_LATENCY_BUCKETS, '+Inf'), values['buckets'],
+        ):
+            cumulative += count
+            lines.append(
+                f'{name}_bucket'
+                f'{labels(view=view, method=method, le=bound)} {cumulative}'
+            )
+        lines.append(
+            f'{name}_sum{labels(view=view, method=method)} '
+            f'{values["duration"]}'
+        )
+        lines.append(
+            f'{name}_count{labels(view=view, method=method)} '
+            f'{values["count"]}'
+        )
+
+    for field, metric, text in SUMMARIES:
+        lines += header(metric, 'summary', text)
+        for (view, method), values in endpoints:
+            lines.append(
+                f'{PREFIX}_{metric}_sum{labels(view=view, method=method)} '
+                f'{values[field]}'
+            )
+            lines.append(
+                f'{PREFIX}_{metric}_count{labels(view=view, method=method)} '
+                f'{values["count"]}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+def view_name(request):
+    """Имя представления, например recipes-list или admin:index."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match.route or 'unnamed'
+
+
+class MetricsMiddleware:
+    """
+    Замеры запросов по представлениям: время ответа, число и время
+    SQL-запросов, время представления и рендеринга, размер ответа.
+
+    Для потоковых ответов замер заканчивается, когда отдан последний
+    фрагмент. Должна стоять первой в MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = request.request_metrics = RequestMetrics()
+        with metrics.track_queries():
+            response = self.get_response(request)
+        finish = (
+            view_name(request),
+            request.method,
+            response.status_code,
+        )
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content,
+                metrics,
+                finish,
+            )
+            metrics.view_finished()
+            return response
+        metrics.response_bytes = len(response.content)
+        registry.record(*finish, metrics)
+        return response
+
+    def stream(self, content, metrics, finish):
+        try:
+            with metrics.track_queries():
+                for chunk in content:
+                    metrics.response_bytes += len(chunk)
+                    yield chunk
+        finally:
+            registry.record(*finish, metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.request_metrics.view_started = perf_counter()
+
+    def process_template_response(self, request, response):
+        metrics = request.request_metrics
+        metrics.view_finished()
+        metrics.render_started = perf_counter()
+        response.add_post_render_callback(metrics.render_finished)
+        return response
@@ -1,9 +1,142 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from foodgram.constants import MAX_LIMIT_PAGE_SIZE, RECIPE_COUNT_CACHE_TIMEOUT
+from recipes.models import FeedEntry
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Пагинатор, кэширующий общее число объектов выборки.
 
-from foodgram.constants import MAX_LIMIT_PAGE_SIZE
+    Кэш включается настройкой RECIPE_COUNT_CACHE: пока он жив, число
+    страниц не учитывает новые и удалённые рецепты.
+    """
+
+    @cached_property
+    def count(self):
+        if not settings.RECIPE_COUNT_CACHE:
+            return super().count
+        try:
+            query = str(self.object_list.query)
+        except EmptyResultSet:
+            return 0
+        key = 'paginator-count:{}'.format(md5(query.encode()).hexdigest())
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, RECIPE_COUNT_CACHE_TIMEOUT)
+        return count
 
 
 class RecipePagination(PageNumberPagination):
-    """Пагинация рецептов."""
+    """
+    Пагинация рецептов.
+
+    По умолчанию постраничная; общее число рецептов кэшируется, только
+    если включена настройка RECIPE_COUNT_CACHE (по умолчанию выключена).
+    С параметром cursor включается keyset-пагинация по (pub_date, id):
+    без COUNT и OFFSET, только поиск по индексу.
+    """
     page_size_query_param = 'limit'
     max_page_size = MAX_LIMIT_PAGE_SIZE
+    django_paginator_class = CachedCountPaginator
+    cursor_query_param = 'cursor'
+    cursor_ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.cursor_ordering)
+        position = self.decode_cursor(request)
+        if position:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        self.results = results[:page_size]
+        return self.results
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        last = self.results[-1]
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(last.pub_date, last.pk),
+        )
+
+    def encode_cursor(self, pub_date, pk):
+        position = f'{pub_date.isoformat()}|{pk}'
+        return urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = urlsafe_b64decode(encoded.encode()).decode()
+            pub_date, pk = position.split('|')
+            pub_date, pk = parse_datetime(pub_date), int(pk)
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+
+class FeedPagination(RecipePagination):
+    """
+    Keyset-пагинация ленты подписок.
+
+    Курсор тот же, что у списка рецептов, но id рецептов страницы
+    берутся из ленты пользователя, а выборка только подтягивает
+    сами рецепты.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        recipe_ids = FeedEntry.objects.recipe_ids(
+            request.user,
+            self.decode_cursor(request),
+            page_size + 1,
+        )
+        recipes = queryset.in_bulk(recipe_ids[:page_size])
+        self.results = [
+            recipes[pk] for pk in recipe_ids[:page_size] if pk in recipes
+        ]
+        self.has_next = len(recipe_ids) > page_size and bool(self.results)
+        return self.results
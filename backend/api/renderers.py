@@ -0,0 +1,155 @@
+import csv
+import json
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer
+
+SHOPPING_LIST_TITLE = 'Список покупок'
+SHOPPING_LIST_HEADERS = ('Ингредиент', 'Единица измерения', 'Количество')
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """
+    Базовый рендерер списка покупок.
+
+    Сам список отдаётся через stream(), render() нужен только для
+    ответов с ошибками. Подкласс определяет parts(rows) — итератор строк
+    файла по строкам (название, единица, сумма), а stream() склеивает их
+    в части не короче chunk_size символов. Настоящим потоком отдаются
+    только текст, CSV и JSON: PDF собирается в памяти целиком.
+    """
+
+    charset = 'utf-8'
+    chunk_size = 64 * 1024
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = data.get('detail', data)
+        return str(data).encode(self.charset or 'utf-8')
+
+    def stream(self, rows):
+        """Итератор частей файла размером около chunk_size."""
+        batch = []
+        size = 0
+        for part in self.parts(rows):
+            batch.append(part)
+            size += len(part)
+            if size >= self.chunk_size:
+                yield ''.join(batch)
+                batch = []
+                size = 0
+        if batch:
+            yield ''.join(batch)
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def parts(self, rows):
+        separator = ''
+        for name, measurement_unit, amount in rows:
+            yield f'{separator}{name} ({measurement_unit}) — {amount}'
+            separator = '\n'
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def parts(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(SHOPPING_LIST_HEADERS)
+        for row in rows:
+            yield writer.writerow(row)
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def parts(self, rows):
+        yield '['
+        separator = ''
+        for name, measurement_unit, amount in rows:
+            item = json.dumps(
+                {
+                    'name': name,
+                    'measurement_unit': measurement_unit,
+                    'amount': amount,
+                },
+                ensure_ascii=False,
+            )
+            yield f'{separator}{item}'
+            separator = ','
+        yield ']'
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    """
+    PDF со списком покупок.
+
+    Формат требует таблицу ссылок в конце файла, поэтому документ
+    собирается целиком в памяти и только затем отдаётся частями: память
+    и время до первого байта растут с длиной списка.
+    """
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    font_name = 'ShoppingListFont'
+    font_size = 12
+    margin = 50
+    line_height = 18
+
+    def stream(self, rows):
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(
+                TTFont(self.font_name, settings.SHOPPING_LIST_PDF_FONT)
+            )
+        buffer = BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        pdf.setFont(self.font_name, self.font_size + 4)
+        pdf.drawString(self.margin, height - self.margin, SHOPPING_LIST_TITLE)
+        pdf.setFont(self.font_name, self.font_size)
+        y = height - self.margin - 2 * self.line_height
+        for name, measurement_unit, amount in rows:
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(self.font_name, self.font_size)
+                y = height - self.margin
+            pdf.drawString(
+                self.margin,
+                y,
+                f'{name} ({measurement_unit}) — {amount}',
+            )
+            y -= self.line_height
+        pdf.save()
+        content = buffer.getvalue()
+        return (
+            content[start:start + self.chunk_size]
+            for start in range(0, len(content), self.chunk_size)
+        )
+
+
+SHOPPING_LIST_RENDERERS = [
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListPDFRenderer,
+]
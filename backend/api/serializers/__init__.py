@@ -1,6 +1,11 @@
+from .recipe_mini import CookableQuerySerializer  # noqa: F401
+from .recipe_mini import CookableRecipeSerializer  # noqa: F401
+from .recipe_mini import PopularQuerySerializer  # noqa: F401
+from .recipe_mini import PopularRecipeSerializer  # noqa: F401
 from .recipe_mini import RecipeMiniSerializer  # noqa: F401
 from .recipes import IngredientAmountSerializer  # noqa: F401
 from .recipes import (IngredientSerializer, RecipeReadSerializer,  # noqa: F401
-                      RecipeWriteSerializer, TagSerializer)
+                      RecipeWriteSerializer, ShoppingCartIngredientSerializer,
+                      TagSerializer)
 from .users import (AvatarSerializer, SubscriptionSerializer,  # noqa: F401
                     UserProfileSerializer)
@@ -1,6 +1,9 @@
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from api.images import variant_urls
+from foodgram.constants import (COOKABLE_DEFAULT_LIMIT, MAX_LIMIT_PAGE_SIZE,
+                                POPULAR_RECIPES_COUNT, RECIPE_IMAGE_VARIANTS)
 from recipes.models import Recipe
 
 
@@ -9,7 +12,71 @@ class RecipeMiniSerializer(serializers.ModelSerializer):
     Базовый сериализатор рецепта.
     """
     image = Base64ImageField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
+
+    def get_image_variants(self, obj):
+        return variant_urls(
+            obj.image,
+            RECIPE_IMAGE_VARIANTS,
+            obj.image_variants_for,
+        )
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    """Параметры поиска рецептов по имеющимся ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=MAX_LIMIT_PAGE_SIZE,
+        default=COOKABLE_DEFAULT_LIMIT,
+    )
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+
+class CookableRecipeSerializer(RecipeMiniSerializer):
+    """Рецепт с числом найденных и недостающих ингредиентов."""
+
+    matched = serializers.IntegerField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+    coverage = serializers.SerializerMethodField()
+
+    class Meta(RecipeMiniSerializer.Meta):
+        fields = RecipeMiniSerializer.Meta.fields + (
+            'matched',
+            'missing',
+            'coverage',
+        )
+
+    def get_coverage(self, obj):
+        return round(obj.matched / (obj.matched + obj.missing), 2)
+
+
+class PopularQuerySerializer(serializers.Serializer):
+    """Параметры списка популярных рецептов."""
+
+    window = serializers.ChoiceField(
+        choices=('day', 'week', 'all'),
+        default='week',
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=MAX_LIMIT_PAGE_SIZE,
+        default=POPULAR_RECIPES_COUNT,
+    )
+
+
+class PopularRecipeSerializer(RecipeMiniSerializer):
+    """Рецепт с числом добавлений за выбранное окно."""
+
+    score = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeMiniSerializer.Meta):
+        fields = RecipeMiniSerializer.Meta.fields + ('score',)
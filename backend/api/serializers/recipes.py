@@ -1,9 +1,17 @@
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
 from django.db.transaction import atomic
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from api.cache import invalidate_recipes, recipe_cache_key
+from api.feed import schedule_fan_out
+from api.fields import (PreloadedPrimaryKeyRelatedField,
+                        StreamingBase64ImageField)
+from api.images import variant_urls
 from api.serializers.users import UserProfileSerializer
-from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from foodgram.constants import RECIPE_CACHE_TIMEOUT, RECIPE_IMAGE_VARIANTS
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCartIngredient, Tag)
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -22,10 +30,35 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
+class ShoppingCartIngredientSerializer(serializers.ModelSerializer):
+    """Сериализатор суммы ингредиента в списке покупок."""
+
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit',
+    )
+
+    class Meta:
+        model = ShoppingCartIngredient
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
+class IngredientAmountListSerializer(serializers.ListSerializer):
+    """Список ингредиентов: все id из запроса загружаются одним запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.child.fields['id'].preload(
+                item.get('id') for item in data if isinstance(item, dict)
+            )
+        return super().to_internal_value(data)
+
+
 class IngredientAmountSerializer(serializers.ModelSerializer):
     """Сериализатор ингредиента с количеством."""
 
-    id = serializers.PrimaryKeyRelatedField(
+    id = PreloadedPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all(),
         source='ingredient',
     )
@@ -37,10 +70,27 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount')
+        list_serializer_class = IngredientAmountListSerializer
+
+
+class RecipeReadListSerializer(serializers.ListSerializer):
+    """Список рецептов: кэшированные представления читаются пачкой."""
+
+    def to_representation(self, data):
+        recipes = list(data)
+        self.child.cached_representations = cache.get_many([
+            recipe_cache_key(recipe.pk) for recipe in recipes
+        ])
+        return super().to_representation(recipes)
 
 
 class RecipeReadSerializer(serializers.ModelSerializer):
-    """Сериализатор рецепта на чтение."""
+    """
+    Сериализатор рецепта на чтение.
+
+    Представление без пользовательских флагов кэшируется по рецепту,
+    флаги подставляются при каждом ответе.
+    """
 
     tags = TagSerializer(many=True, read_only=True)
     author = UserProfileSerializer(read_only=True)
@@ -51,6 +101,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         default=False,
     )
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -63,13 +114,50 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
+        list_serializer_class = RecipeReadListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cached_representations = {}
 
     def get_image(self, obj):
         return obj.image.url if obj.image else None
 
+    def get_image_variants(self, obj):
+        return variant_urls(
+            obj.image,
+            RECIPE_IMAGE_VARIANTS,
+            obj.image_variants_for,
+        )
+
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+
+        key = recipe_cache_key(instance.pk)
+        data = self.cached_representations.get(key) or cache.get(key)
+        if data is None:
+            data = super().to_representation(instance)
+            data['is_favorited'] = False
+            data['is_in_shopping_cart'] = False
+            data['author']['is_subscribed'] = False
+            cache.set(key, data, RECIPE_CACHE_TIMEOUT)
+
+        data['is_favorited'] = getattr(instance, 'is_favorited', False)
+        data['is_in_shopping_cart'] = getattr(
+            instance,
+            'is_in_shopping_cart',
+            False,
+        )
+        data['author']['is_subscribed'] = (
+            self.fields['author'].get_is_subscribed(instance.author)
+        )
+        return data
+
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
     """Сериализатор рецепта на запись."""
@@ -80,14 +168,14 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         allow_empty=False,
         required=True,
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = PreloadedPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True,
         write_only=True,
         allow_empty=False,
         required=True,
     )
-    image = Base64ImageField(required=True)
+    image = StreamingBase64ImageField(required=True)
 
     class Meta:
         model = Recipe
@@ -159,17 +247,103 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(author=user, **validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(recipe, ingredients)
+        schedule_fan_out(recipe.pk)
         return recipe
 
+    def update_fields(self, instance, validated_data):
+        """Сохраняет только изменившиеся поля рецепта."""
+        changed = [
+            name for name, value in validated_data.items()
+            if name == 'image' or getattr(instance, name) != value
+        ]
+        for name in changed:
+            setattr(instance, name, validated_data[name])
+        if changed:
+            instance.save(update_fields=changed)
+        return changed
+
+    def update_tags(self, instance, tags):
+        """Добавляет новые и убирает лишние теги рецепта."""
+        old_ids = set(instance.tags.values_list('pk', flat=True))
+        new_ids = {tag.pk for tag in tags}
+        added = sorted(new_ids - old_ids)
+        removed = sorted(old_ids - new_ids)
+        if added:
+            instance.tags.add(*added)
+        if removed:
+            instance.tags.remove(*removed)
+        return {'added': added, 'removed': removed}
+
+    def update_ingredients(self, instance, ingredients):
+        """
+        Сравнивает ингредиенты рецепта с присланными.
+
+        Новые строки создаются, изменившиеся количества обновляются
+        одним запросом, лишние строки удаляются.
+        """
+        rows = {row.ingredient_id: row for row in instance.ingredients.all()}
+        old_amounts = {pk: row.amount for pk, row in rows.items()}
+        new_amounts = {
+            item['ingredient'].id: item['amount'] for item in ingredients
+        }
+        created = [
+            RecipeIngredient(
+                recipe=instance,
+                ingredient_id=ingredient_id,
+                amount=amount,
+            )
+            for ingredient_id, amount in new_amounts.items()
+            if ingredient_id not in rows
+        ]
+        updated = []
+        for ingredient_id, row in rows.items():
+            amount = new_amounts.get(ingredient_id, row.amount)
+            if amount != row.amount:
+                row.amount = amount
+                updated.append(row)
+        deleted = sorted(rows.keys() - new_amounts.keys())
+
+        RecipeIngredient.objects.bulk_create(created)
+        RecipeIngredient.objects.bulk_update(updated, ['amount'])
+        if deleted:
+            instance.ingredients.filter(ingredient__in=deleted).delete()
+        if created or updated or deleted:
+            ShoppingCartIngredient.objects.update_recipe(
+                instance,
+                old_amounts,
+                new_amounts,
+            )
+        return {
+            'created': sorted(row.ingredient_id for row in created),
+            'updated': sorted(row.ingredient_id for row in updated),
+            'deleted': deleted,
+        }
+
     @atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
+        """
+        Записывает только отличия от текущего рецепта.
+
+        Список изменений сохраняется в self.changes и отдаётся в ответе.
+        """
         tags = validated_data.pop('tags')
-        instance = super().update(instance, validated_data)
-        instance.tags.set(tags)
-        instance.recipe_ingredients.clear()
-        self.create_ingredients(instance, ingredients)
+        ingredients = validated_data.pop('ingredients')
+        self.changes = {
+            'fields': self.update_fields(instance, validated_data),
+            'tags': self.update_tags(instance, tags),
+            'ingredients': self.update_ingredients(instance, ingredients),
+        }
+        if (
+            self.changes['fields']
+            or any(self.changes['tags'].values())
+            or any(self.changes['ingredients'].values())
+        ):
+            invalidate_recipes([instance.pk])
         return instance
 
     def to_representation(self, instance):
-        return RecipeReadSerializer(instance, context=self.context).data
+        prefetch_related_objects([instance], 'tags', 'ingredients__ingredient')
+        data = RecipeReadSerializer(instance, context=self.context).data
+        if hasattr(self, 'changes'):
+            data = {**data, 'changes': self.changes}
+        return data
@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from api.fields import StreamingBase64ImageField
+from api.images import variant_urls
 from api.serializers.recipe_mini import RecipeMiniSerializer
+from foodgram.constants import AVATAR_IMAGE_VARIANTS
 
 User = get_user_model()
 
@@ -12,32 +14,57 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.SerializerMethodField()
+    avatar_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = (
             'id', 'email', 'username',
             'first_name', 'last_name',
-            'avatar', 'is_subscribed',
+            'avatar', 'avatar_variants', 'is_subscribed',
         )
         read_only_fields = fields
 
+    @property
+    def subscribed_ids(self):
+        """
+        Id авторов, на которых подписан текущий пользователь.
+
+        Загружаются одним запросом и хранятся в общем контексте
+        сериализаторов до конца ответа.
+        """
+        if 'subscribed_ids' not in self.context:
+            request = self.context.get('request')
+            self.context['subscribed_ids'] = (
+                set(request.user.subscriptions.values_list(
+                    'author_id',
+                    flat=True,
+                ))
+                if request and request.user.is_authenticated
+                else set()
+            )
+        return self.context['subscribed_ids']
+
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        return (
-            request
-            and request.user.is_authenticated
-            and obj.subscribers.filter(user=request.user).exists()
-        )
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return obj.pk in self.subscribed_ids
 
     def get_avatar(self, obj):
         return obj.avatar.url if obj.avatar else None
 
+    def get_avatar_variants(self, obj):
+        return variant_urls(
+            obj.avatar,
+            AVATAR_IMAGE_VARIANTS,
+            obj.avatar_variants_for,
+        )
+
 
 class AvatarSerializer(serializers.ModelSerializer):
     """Сериализатор аватара."""
 
-    avatar = Base64ImageField(required=True)
+    avatar = StreamingBase64ImageField(required=True)
 
     class Meta:
         model = User
@@ -60,11 +87,13 @@ class SubscriptionSerializer(UserProfileSerializer):
         fields = (
             'id', 'email', 'username',
             'first_name', 'last_name',
-            'avatar', 'is_subscribed',
+            'avatar', 'avatar_variants', 'is_subscribed',
             'recipes', 'recipes_count',
         )
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'latest_recipes'):
+            return RecipeMiniSerializer(obj.latest_recipes, many=True).data
         request = self.context.get('request')
         limit = (
             request.query_params.get('recipes_limit')
@@ -0,0 +1,231 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.cache import (bump_data_version, drop_recipes, invalidate_auth_tokens,
+                       invalidate_recipes)
+from api.images import schedule_variants
+from foodgram.constants import AVATAR_IMAGE_VARIANTS, RECIPE_IMAGE_VARIANTS
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart,
+                            ShoppingCartIngredient, Tag)
+from users.models import Subscription
+
+User = get_user_model()
+
+# Поля пользователя, которые попадают в ответы с рецептами.
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name', 'avatar')
+
+
+def change_counter(model, pk, field, delta):
+    """
+    Сдвигает счётчик на delta, не опуская его ниже нуля.
+
+    Счётчики ведутся сигналами, поэтому учитываются и объекты, созданные
+    или удалённые через админку, ORM и каскадом. Массовые bulk_create и
+    update сигналов не шлют, после них нужен recount_counters.
+    """
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def relation_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, sender.counter_field, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def relation_deleted(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, sender.counter_field, -1)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipes([instance.pk])
+
+
+def recipe_variants_ready(recipe, name):
+    """
+    Отмечает, что копии картинки рецепта готовы.
+
+    Отметка ставится и на сохранённом объекте: ответ на запрос, который
+    его сохранил, сериализуется уже после коммита.
+    """
+    if recipe.image.name == name:
+        recipe.image_variants_for = name
+    if Recipe.objects.filter(pk=recipe.pk, image=name).exclude(
+        image_variants_for=name,
+    ).update(image_variants_for=name):
+        drop_recipes([recipe.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields, **kwargs):
+    if update_fields and 'image' not in update_fields:
+        return
+    if instance.image.name == instance.image_variants_for:
+        return
+    schedule_variants(
+        instance.image,
+        RECIPE_IMAGE_VARIANTS,
+        on_done=partial(recipe_variants_ready, instance),
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+    bump_data_version('short-links')
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_created(sender, instance, created, **kwargs):
+    if created:
+        ShoppingCartIngredient.objects.add_recipe(
+            [instance.user_id],
+            instance.recipe,
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def shopping_cart_deleting(sender, instance, **kwargs):
+    # pre_delete всех объектов каскада приходит до удаления строк,
+    # поэтому ингредиенты удаляемого рецепта ещё на месте.
+    ShoppingCartIngredient.objects.add_recipe(
+        [instance.user_id],
+        instance.recipe,
+        sign=-1,
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    invalidate_recipes([instance.recipe_id])
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted(sender, instance, **kwargs):
+    bump_data_version('recipe-ingredients')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_recipes([instance.pk])
+    elif action == 'pre_clear':
+        invalidate_recipes(instance.recipes.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_recipes(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    bump_data_version('tags')
+    invalidate_recipes(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    bump_data_version('ingredients')
+    invalidate_recipes(
+        instance.recipe_ingredients.values_list('recipe_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kwargs):
+    bump_data_version('ingredients')
+
+
+def avatar_variants_ready(user, recipe_ids, name):
+    """Отмечает, что копии аватара готовы, и на сохранённом объекте тоже."""
+    if user.avatar.name == name:
+        user.avatar_variants_for = name
+    if User.objects.filter(pk=user.pk, avatar=name).exclude(
+        avatar_variants_for=name,
+    ).update(avatar_variants_for=name):
+        drop_recipes(recipe_ids)
+        invalidate_auth_tokens(
+            Token.objects.filter(user_id=user.pk)
+            .values_list('key', flat=True)
+        )
+
+
+@receiver(pre_save, sender=User)
+def author_saving(sender, instance, update_fields, **kwargs):
+    """Запоминает, какие поля автора в ответах рецептов изменились."""
+    fields = AUTHOR_FIELDS
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+    stored = User.objects.filter(pk=instance.pk).values(*fields).first()
+    instance.changed_author_fields = {
+        field for field in fields
+        if stored is None
+        or (getattr(instance, field) or '') != (stored[field] or '')
+    }
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, **kwargs):
+    changed = getattr(instance, 'changed_author_fields', AUTHOR_FIELDS)
+    if not changed:
+        return
+    recipe_ids = list(instance.recipes.values_list('pk', flat=True))
+    invalidate_recipes(recipe_ids)
+    if (
+        'avatar' in changed
+        and instance.avatar.name != instance.avatar_variants_for
+    ):
+        schedule_variants(
+            instance.avatar,
+            AVATAR_IMAGE_VARIANTS,
+            on_done=partial(avatar_variants_ready, instance, recipe_ids),
+        )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    invalidate_auth_tokens(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_auth_tokens([instance.key])
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'subscribers_count', 1)
+        FeedEntry.objects.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'subscribers_count', -1)
+    FeedEntry.objects.filter(
+        user_id=instance.user_id,
+        author_id=instance.author_id,
+    ).delete()
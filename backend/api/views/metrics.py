@@ -0,0 +1,17 @@
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+from api.metrics import registry, render_metrics
+
+
+class MetricsView(APIView):
+    """Метрики запросов в формате Prometheus, только для персонала."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            render_metrics(*registry.collect()),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
@@ -1,7 +1,12 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.db.transaction import atomic
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -9,17 +14,35 @@ from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
+from api.cache import cache_is_shared, data_version_etag
+from api.cookable_index import cookable_index
 from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import RecipePagination
+from api.ingredient_index import ingredient_index
+from api.pagination import FeedPagination, RecipePagination
 from api.permissions import IsAuthorOrReadOnly
-from api.serializers.recipe_mini import RecipeMiniSerializer
+from api.renderers import SHOPPING_LIST_RENDERERS
+from api.serializers.recipe_mini import (CookableQuerySerializer,
+                                         CookableRecipeSerializer,
+                                         PopularQuerySerializer,
+                                         PopularRecipeSerializer,
+                                         RecipeMiniSerializer)
 from api.serializers.recipes import (IngredientSerializer,
                                      RecipeReadSerializer,
-                                     RecipeWriteSerializer, TagSerializer)
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                                     RecipeWriteSerializer,
+                                     ShoppingCartIngredientSerializer,
+                                     TagSerializer)
+from foodgram.constants import (POPULAR_CACHE_TIMEOUT,
+                                SHOPPING_LIST_CHUNK_SIZE,
+                                SIMILAR_RECIPES_COUNT)
+from recipes.models import (Favorite, Ingredient, PopularityBucket, Recipe,
+                            ShoppingCart, ShoppingCartIngredient, Tag)
 
 
+@method_decorator(cache_control(no_cache=True), name='dispatch')
+@method_decorator(
+    condition(etag_func=data_version_etag('tags')),
+    name='dispatch',
+)
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """Вьюсет тегов."""
 
@@ -29,6 +52,11 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
 
 
+@method_decorator(cache_control(no_cache=True), name='dispatch')
+@method_decorator(
+    condition(etag_func=data_version_etag('ingredients')),
+    name='dispatch',
+)
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     """Вьюсет ингредиентов."""
 
@@ -39,6 +67,16 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if (
+            name
+            and settings.INGREDIENT_PREFIX_INDEX
+            and cache_is_shared()
+        ):
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Вьюсет рецептов."""
@@ -50,13 +88,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
     pagination_class = RecipePagination
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'feed'):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
     def get_queryset(self):
+        if self.action in ('list', 'retrieve', 'feed'):
+            return Recipe.objects.for_read(self.request.user)
         return Recipe.objects.with_user_annotations(self.request.user)
 
+    @atomic
     def _add_to_model(self, request, pk, model):
         user = request.user
         recipe = get_object_or_404(Recipe, pk=pk)
@@ -66,24 +107,25 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 {'detail': f'Рецепт уже в {model._meta.verbose_name}.'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        PopularityBucket.objects.record(recipe.pk, obj.created_at, 1)
         serializer = RecipeMiniSerializer(
             recipe,
             context={'request': request},
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @atomic
     def _remove_from_model(self, request, pk, model):
         user = request.user
         recipe = get_object_or_404(Recipe, pk=pk)
-        deleted, _ = model.objects.filter(
-            user=user,
-            recipe=recipe,
-        ).delete()
-        if deleted == 0:
+        relation = model.objects.filter(user=user, recipe=recipe).first()
+        if relation is None:
             return Response(
                 {'detail': f'Рецепта нет в {model._meta.verbose_name}.'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        relation.delete()
+        PopularityBucket.objects.record(recipe.pk, relation.created_at, -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -121,32 +163,155 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['get'],
         url_path='download_shopping_cart',
         permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
     )
     def download_shopping_cart(self, request):
-        user = request.user
-        ingredients = (
-            RecipeIngredient.objects
-            .filter(recipe__shoppingcart_set__user=user)
-            .values(
+        """Список покупок в формате txt, csv, json (потоком) или pdf."""
+        renderer = request.accepted_renderer
+        rows = (
+            ShoppingCartIngredient.objects
+            .filter(user=request.user)
+            .values_list(
                 'ingredient__name',
                 'ingredient__measurement_unit',
+                'amount',
             )
-            .annotate(total_amount=Sum('amount'))
             .order_by('ingredient__name')
+            .iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+        )
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.stream(rows),
+            content_type=content_type,
         )
-        lines = [
-            f"{item['ingredient__name']} "
-            f"({item['ingredient__measurement_unit']}) — "
-            f"{item['total_amount']}"
-            for item in ingredients
-        ]
-        content = '\n'.join(lines)
-        response = HttpResponse(content, content_type='text/plain')
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_cart.txt"'
+            f'attachment; filename="shopping_cart.{renderer.format}"'
         )
         return response
 
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='shopping_cart_summary',
+        permission_classes=[IsAuthenticated],
+    )
+    def shopping_cart_summary(self, request):
+        """Суммы ингредиентов в списке покупок в JSON."""
+        totals = (
+            ShoppingCartIngredient.objects
+            .filter(user=request.user)
+            .select_related('ingredient')
+            .order_by('ingredient__name')
+        )
+        serializer = ShoppingCartIngredientSerializer(totals, many=True)
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='cookable',
+    )
+    def cookable(self, request):
+        """
+        Рецепты, которые можно приготовить из указанных ингредиентов.
+
+        Ранжируются по доле ингредиентов рецепта, которые уже есть,
+        затем по числу недостающих.
+        """
+        params = CookableQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ranked = cookable_index.search(
+            params.validated_data['ingredients'],
+            params.validated_data['limit'],
+            params.validated_data.get('max_missing'),
+        )
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in ranked]
+        )
+        results = []
+        for recipe_id, matched, missing in ranked:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.matched, recipe.missing = matched, missing
+            results.append(recipe)
+        serializer = CookableRecipeSerializer(
+            results,
+            many=True,
+            context={'request': request},
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        """Новые рецепты авторов, на которых подписан пользователь."""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+    )
+    def popular(self, request):
+        """
+        Самые популярные рецепты за день, неделю или всё время.
+
+        Популярность — число добавлений в избранное и списки покупок
+        за окно. Ответ кэшируется на POPULAR_CACHE_TIMEOUT секунд.
+        """
+        params = PopularQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        window = params.validated_data['window']
+        limit = params.validated_data['limit']
+        key = f'popular-recipes:{window}:{limit}'
+        data = cache.get(key)
+        if data is None:
+            ranked = PopularityBucket.objects.top(window, limit)
+            recipes = Recipe.objects.in_bulk(
+                [recipe_id for recipe_id, _ in ranked]
+            )
+            results = []
+            for recipe_id, score in ranked:
+                recipe = recipes.get(recipe_id)
+                if recipe is not None:
+                    recipe.score = score
+                    results.append(recipe)
+            data = PopularRecipeSerializer(
+                results,
+                many=True,
+                context={'request': request},
+            ).data
+            cache.set(key, data, POPULAR_CACHE_TIMEOUT)
+        return Response(data)
+
+    @action(
+        detail=True,
+        methods=['get'],
+    )
+    def similar(self, request, pk=None):
+        """Похожие рецепты, заранее найденные build_similar_recipes."""
+        recipe = get_object_or_404(Recipe, pk=pk)
+        similar = [
+            relation.similar
+            for relation in recipe.similar_recipes.select_related(
+                'similar',
+            )[:SIMILAR_RECIPES_COUNT]
+        ]
+        serializer = RecipeMiniSerializer(
+            similar,
+            many=True,
+            context={'request': request},
+        )
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=['post'],
@@ -1,5 +1,7 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
-from django.db.models import Count
+from django.db.transaction import atomic
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import status
@@ -9,6 +11,7 @@ from rest_framework.response import Response
 
 from api.serializers import (AvatarSerializer, SubscriptionSerializer,
                              UserProfileSerializer)
+from recipes.models import Recipe
 from users.models import Subscription
 from users.pagination import UserPagination
 
@@ -21,6 +24,19 @@ class UserViewSet(DjoserUserViewSet):
     pagination_class = UserPagination
     permission_classes = [AllowAny]
 
+    def _attach_recipes(self, authors):
+        """Прикрепляет к авторам их последние рецепты."""
+        limit = self.request.query_params.get('recipes_limit')
+        limit = int(limit) if limit and limit.isdigit() else None
+        author_ids = [author.pk for author in authors]
+
+        latest_recipes = defaultdict(list)
+        for recipe in Recipe.objects.latest_by_author(author_ids, limit):
+            latest_recipes[recipe.author_id].append(recipe)
+        for author in authors:
+            author.latest_recipes = latest_recipes[author.pk]
+        return authors
+
     @action(
         detail=False,
         methods=['get'],
@@ -70,13 +86,11 @@ class UserViewSet(DjoserUserViewSet):
     def subscriptions(self, request):
         queryset = User.objects.filter(
             subscribers__user=request.user
-        ).annotate(
-            recipes_count=Count('recipes')
         ).order_by('username')
 
         page = self.paginate_queryset(queryset)
         serializer = self.get_serializer(
-            page,
+            self._attach_recipes(page),
             many=True,
             context={'request': request},
         )
@@ -88,12 +102,10 @@ class UserViewSet(DjoserUserViewSet):
         permission_classes=[IsAuthenticated],
         serializer_class=SubscriptionSerializer,
     )
+    @atomic
     def subscribe(self, request, id=None):
         user = request.user
-        author = get_object_or_404(
-            User.objects.annotate(recipes_count=Count('recipes')),
-            id=id,
-        )
+        author = get_object_or_404(User, id=id)
 
         if author == user:
             return Response(
@@ -111,6 +123,7 @@ class UserViewSet(DjoserUserViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        self._attach_recipes([author])
         serializer = self.get_serializer(
             author,
             context={'request': request},
@@ -118,6 +131,7 @@ class UserViewSet(DjoserUserViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
+    @atomic
     def unsubscribe(self, request, id=None):
         user = request.user
         author = get_object_or_404(User, id=id)
@@ -1,8 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
 from django.core.validators import RegexValidator
 
 # Пагинация
 BASIC_PAGE_SIZE = 6
 MAX_LIMIT_PAGE_SIZE = 100
+COOKABLE_DEFAULT_LIMIT = 10
+
+# Кэширование
+RECIPE_CACHE_TIMEOUT = 60 * 5
+RECIPE_COUNT_CACHE_TIMEOUT = 30
+INGREDIENT_INDEX_TTL = 60 * 10
+RECIPE_INGREDIENT_INDEX_TTL = 60 * 10
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 5
+
+# Короткие ссылки
+SHORT_LINK_CACHE_SIZE = 10000
+SHORT_LINK_NEGATIVE_TTL = 60 * 5
+SHORT_LINK_MAX_AGE = 60 * 60
+
+# Картинки
+IMAGE_MAX_UPLOAD_SIZE = 7 * 1024 * 1024
+IMAGE_MAX_PIXELS = 25_000_000
+IMAGE_DECODE_CHUNK_SIZE = 64 * 1024
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+RECIPE_IMAGE_VARIANTS = {'card': (480, 480), 'detail': (1200, 1200)}
+AVATAR_IMAGE_VARIANTS = {'small': (64, 64), 'medium': (192, 192)}
+
+# Выгрузка списка покупок
+SHOPPING_LIST_CHUNK_SIZE = 2000
+
+# Перенос рецептов и импорт ингредиентов
+RECIPE_TRANSFER_BATCH_SIZE = 1000
+RECIPE_IMAGE_COPY_WORKERS = 4
+INGREDIENT_IMPORT_BATCH_SIZE = 1000
+IMPORT_READ_CHUNK_SIZE = 64 * 1024
+
+# Похожие рецепты
+SIMILAR_RECIPES_COUNT = 10
+SIMILAR_MAX_CANDIDATES = 1000
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 32
+SIMILARITY_CHUNK_SIZE = 500
+
+# Популярные рецепты
+POPULAR_RECIPES_COUNT = 10
+POPULAR_CACHE_TIMEOUT = 60
+POPULARITY_ALL_START = datetime(1970, 1, 1, tzinfo=timezone.utc)
+POPULARITY_HOUR_RETENTION = timedelta(hours=48)
+POPULARITY_DAY_RETENTION = timedelta(days=14)
+
+# Лента подписок
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_FANOUT_MAX_SUBSCRIBERS = 10000
+FEED_BACKFILL_COUNT = 50
+
+# Метрики запросов
+METRICS_FLUSH_INTERVAL = 5
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+# Бенчмарк
+BENCHMARK_SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+BENCHMARK_SEED = 2024
+BENCHMARK_ITERATIONS = 50
+BENCHMARK_WARMUP = 5
+BENCHMARK_REGRESSION_THRESHOLD = 0.2
+BENCHMARK_SAMPLE_SIZE = 100
+BENCHMARK_BATCH_SIZE = 5000
+BENCHMARK_MIN_USERS = 100
+BENCHMARK_RECIPES_PER_USER = 10
 
 # Ограничения длины
 EMAIL_MAX_LENGTH = 254
@@ -13,6 +82,8 @@ TAG_NAME_MAX_LENGTH = 32
 
 INGREDIENT_NAME_MAX_LENGTH = 128
 INGREDIENT_MEASURE_MAX_LENGTH = 64
+MD5_HEX_LENGTH = 32
+POPULARITY_PERIOD_MAX_LENGTH = 4
 COLOR_NAME_MAX_LENGTH = 7
 
 RECIPE_NAME_MAX_LENGTH = 256
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from django.core.management.utils import get_random_secret_key
@@ -36,6 +37,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,6 +89,52 @@ else:
         }
     }
 
+# Общий для воркеров кэш (файловый по умолчанию) включается только явно
+# заданным CACHE_LOCATION, иначе у каждого процесса свой кэш в памяти.
+CACHE_LOCATION = os.getenv('CACHE_LOCATION', '')
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ) if CACHE_LOCATION else (
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': CACHE_LOCATION,
+    }
+}
+
+# Кэш общего числа рецептов в постраничной выдаче
+RECIPE_COUNT_CACHE = os.getenv(
+    'RECIPE_COUNT_CACHE',
+    default='False',
+).lower() in ('true', '1')
+
+# Поиск ингредиентов по индексу в памяти процесса
+INGREDIENT_PREFIX_INDEX = os.getenv(
+    'INGREDIENT_PREFIX_INDEX',
+    default='True',
+).lower() in ('true', '1')
+
+# Шрифт с кириллицей для списка покупок в PDF
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+)
+
+# Потоки для создания уменьшенных копий картинок, 0 — без фона
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', default=2))
+
+# Потоки для рассылки новых рецептов в ленты подписчиков, 0 — без фона
+FEED_FANOUT_WORKERS = int(os.getenv('FEED_FANOUT_WORKERS', default=1))
+
+# Каталог, где воркеры gunicorn складывают свои метрики
+METRICS_DIR = os.getenv(
+    'METRICS_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'foodgram-metrics'),
+)
+
 AUTH_USER_MODEL = 'users.User'
 
 LANGUAGE_CODE = 'ru-RU'
@@ -106,7 +154,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'PAGE_SIZE': BASIC_PAGE_SIZE,
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingCartIngredient, Tag)
 
 
 @admin.register(Tag)
@@ -32,16 +32,25 @@ class RecipeAdmin(admin.ModelAdmin):
         'name',
         'author',
         'cooking_time',
-        'favorite_count',
+        'favorites_count',
     )
     search_fields = ('name', 'author__username', 'tags__name')
     list_filter = ('tags',)
+    list_select_related = ('author',)
     inlines = [RecipeIngredientInline]
 
-    @admin.display(description='Добавлений в избранное')
-    def favorite_count(self, obj):
-        """Возвращает количество добавлений рецепта в избранное."""
-        return obj.favorited_by.count()
+    def save_related(self, request, form, formsets, change):
+        """Переносит правку ингредиентов в суммы списков покупок."""
+        recipe = form.instance
+        old_amounts = dict(
+            recipe.ingredients.values_list('ingredient_id', 'amount')
+        )
+        super().save_related(request, form, formsets, change)
+        ShoppingCartIngredient.objects.update_recipe(
+            recipe,
+            old_amounts,
+            dict(recipe.ingredients.values_list('ingredient_id', 'amount')),
+        )
 
 
 @admin.register(Favorite)
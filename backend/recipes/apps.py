@@ -1,7 +1,19 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
 
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = 'Рецепты'
+
+    def ready(self):
+        post_migrate.connect(ensure_search_index, sender=self)
+
+
+def ensure_search_index(using, **kwargs):
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        from recipes.search import restore_sqlite_triggers
+        restore_sqlite_triggers(connection)
@@ -0,0 +1,282 @@
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from io import BytesIO, StringIO
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from foodgram.constants import (BENCHMARK_BATCH_SIZE, BENCHMARK_MIN_USERS,
+                                BENCHMARK_RECIPES_PER_USER)
+from recipes.management.commands.import_ingredients import iter_csv
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Subscription
+
+User = get_user_model()
+
+SHORT_CODE_PREFIX = 'bench'
+USERNAME_PREFIX = 'bench'
+IMAGE_NAME = 'recipes/images/benchmark.png'
+START_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+TAGS = (
+    ('Завтрак', 'breakfast'),
+    ('Обед', 'lunch'),
+    ('Ужин', 'dinner'),
+    ('Десерт', 'dessert'),
+    ('Выпечка', 'bakery'),
+    ('Суп', 'soup'),
+    ('Салат', 'salad'),
+    ('Напитки', 'drinks'),
+    ('Постное', 'lenten'),
+    ('На скорую руку', 'quick'),
+)
+DISHES = (
+    'суп', 'салат', 'пирог', 'омлет', 'каша', 'паста', 'рагу',
+    'запеканка', 'блины', 'котлеты', 'плов', 'соус',
+)
+ADJECTIVES = (
+    'Домашний', 'Быстрый', 'Постный', 'Острый', 'Летний', 'Сытный',
+    'Бабушкин', 'Праздничный', 'Лёгкий', 'Деревенский',
+)
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Сергей')
+LAST_NAMES = ('Иванова', 'Петров', 'Смирнова', 'Кузнецов', 'Попова')
+
+
+def benchmark_image():
+    """Небольшая картинка PNG для рецептов бенчмарка."""
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), (200, 120, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def batches(items, size):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+class DatasetBuilder:
+    """
+    Детерминированный набор данных для бенчмарка.
+
+    При одном и том же зерне и масштабе строятся одинаковые пользователи,
+    рецепты, теги, ингредиенты из data/ingredients.csv, избранное, списки
+    покупок и подписки. Популярные авторы и рецепты выбираются чаще
+    остальных, как на живом сайте. Первый пользователь — тот, от чьего
+    имени идут запросы: у него полный список покупок и подписки.
+    """
+
+    def __init__(self, recipes, seed, batch_size=BENCHMARK_BATCH_SIZE,
+                 log=None):
+        self.recipes_count = recipes
+        self.users_count = max(
+            BENCHMARK_MIN_USERS,
+            recipes // BENCHMARK_RECIPES_PER_USER,
+        )
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+
+    def skewed(self, size):
+        """Индекс от 0 до size - 1, чаще маленький."""
+        return int(size * self.random.random() ** 3)
+
+    def dataset_recipes(self):
+        return Recipe.objects.filter(short_code__startswith=SHORT_CODE_PREFIX)
+
+    def is_built(self):
+        return self.dataset_recipes().count() == self.recipes_count
+
+    def prepare(self):
+        """
+        Готовит базу к прогону: строит набор данных или, если он уже
+        есть, удаляет рецепты, созданные прошлыми прогонами.
+        """
+        default_storage.save(IMAGE_NAME, ContentFile(benchmark_image()))
+        if self.is_built():
+            Recipe.objects.exclude(
+                short_code__startswith=SHORT_CODE_PREFIX,
+            ).delete()
+        else:
+            self.build()
+        self.user_ids = list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        self.token = Token.objects.get_or_create(user_id=self.user_ids[0])[0]
+
+    def build(self):
+        self.create_tags()
+        self.create_ingredients()
+        self.create_users()
+        self.create_recipes()
+        self.create_relations()
+        self.log('Пересчёт счётчиков')
+        call_command('recount_counters', stdout=StringIO())
+
+    def create_tags(self):
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=slug) for name, slug in TAGS],
+            ignore_conflicts=True,
+        )
+        self.tag_ids = list(
+            Tag.objects.filter(slug__in=[slug for _, slug in TAGS])
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+    def create_ingredients(self):
+        path = os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv')
+        with open(path, encoding='utf-8') as file:
+            rows = [row for row in iter_csv(file) if len(row) == 2]
+        for batch in batches(rows, self.batch_size):
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=unit)
+                    for name, unit in batch
+                ],
+                ignore_conflicts=True,
+            )
+        self.ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        self.log(f'Ингредиентов: {len(self.ingredient_ids)}')
+
+    def create_users(self):
+        password = make_password(None)
+        for batch in batches(range(self.users_count), self.batch_size):
+            User.objects.bulk_create([
+                User(
+                    email=f'{USERNAME_PREFIX}{index}@example.com',
+                    username=f'{USERNAME_PREFIX}{index}',
+                    first_name=self.random.choice(FIRST_NAMES),
+                    last_name=self.random.choice(LAST_NAMES),
+                    password=password,
+                )
+                for index in batch
+            ])
+        self.user_ids = list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        self.log(f'Пользователей: {len(self.user_ids)}')
+
+    def recipe(self, index):
+        dish = self.random.choice(DISHES)
+        return Recipe(
+            author_id=self.user_ids[self.skewed(len(self.user_ids))],
+            name=f'{self.random.choice(ADJECTIVES)} {dish} №{index}',
+            text=(
+                f'Пошаговый рецепт: {dish} из доступных продуктов. '
+                f'Готовится в {self.random.randint(2, 5)} этапа.'
+            ),
+            cooking_time=self.random.randint(5, 180),
+            image=IMAGE_NAME,
+            short_code=f'{SHORT_CODE_PREFIX}{index}',
+        )
+
+    def create_recipes(self):
+        self.recipe_ids = []
+        for batch in batches(range(self.recipes_count), self.batch_size):
+            Recipe.objects.bulk_create([self.recipe(index) for index in batch])
+            ids = dict(
+                self.dataset_recipes().filter(short_code__in=[
+                    f'{SHORT_CODE_PREFIX}{index}' for index in batch
+                ]).values_list('short_code', 'pk')
+            )
+            recipes = [
+                Recipe(
+                    pk=ids[f'{SHORT_CODE_PREFIX}{index}'],
+                    pub_date=START_DATE + timedelta(minutes=index * 7),
+                )
+                for index in batch
+            ]
+            Recipe.objects.bulk_update(recipes, ['pub_date'])
+            self.create_recipe_relations([recipe.pk for recipe in recipes])
+            self.recipe_ids.extend(recipe.pk for recipe in recipes)
+            self.log(f'Рецептов: {len(self.recipe_ids)}')
+
+    def create_recipe_relations(self, recipe_ids):
+        tags = []
+        ingredients = []
+        for recipe_id in recipe_ids:
+            for tag_id in self.random.sample(
+                self.tag_ids,
+                self.random.randint(1, 3),
+            ):
+                tags.append(
+                    Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                )
+            chosen = {
+                self.ingredient_ids[self.skewed(len(self.ingredient_ids))]
+                for _ in range(self.random.randint(3, 10))
+            }
+            ingredients.extend(
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, 500),
+                )
+                for ingredient_id in sorted(chosen)
+            )
+        Recipe.tags.through.objects.bulk_create(tags)
+        RecipeIngredient.objects.bulk_create(
+            ingredients,
+            batch_size=self.batch_size,
+        )
+
+    def choose(self, ids, count, exclude=None):
+        chosen = {ids[self.skewed(len(ids))] for _ in range(count)}
+        chosen.discard(exclude)
+        return sorted(chosen)
+
+    def user_relations(self, position, user_id):
+        """Избранное, список покупок и подписки одного пользователя."""
+        first = position == 0
+        favorites = self.choose(
+            self.recipe_ids,
+            20 if first else self.random.randint(0, 20),
+        )
+        carts = self.choose(
+            self.recipe_ids,
+            5 if first else self.random.randint(0, 5),
+        )
+        authors = self.choose(
+            self.user_ids,
+            15 if first else self.random.randint(0, 15),
+            exclude=user_id,
+        )
+        return (
+            [Favorite(user_id=user_id, recipe_id=pk) for pk in favorites],
+            [ShoppingCart(user_id=user_id, recipe_id=pk) for pk in carts],
+            [Subscription(user_id=user_id, author_id=pk) for pk in authors],
+        )
+
+    def create_relations(self):
+        for batch in batches(enumerate(self.user_ids), self.batch_size):
+            favorites, carts, subscriptions = [], [], []
+            for position, user_id in batch:
+                user_favorites, user_carts, user_subscriptions = (
+                    self.user_relations(position, user_id)
+                )
+                favorites.extend(user_favorites)
+                carts.extend(user_carts)
+                subscriptions.extend(user_subscriptions)
+            Favorite.objects.bulk_create(favorites)
+            ShoppingCart.objects.bulk_create(carts)
+            Subscription.objects.bulk_create(subscriptions)
+        self.log('Избранное, списки покупок и подписки созданы')
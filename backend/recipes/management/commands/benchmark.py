@@ -0,0 +1,340 @@
+import json
+import logging
+import os
+import platform
+import random
+from base64 import b64encode
+from statistics import mean, median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+from rest_framework.test import APIClient
+
+from foodgram.constants import (BENCHMARK_ITERATIONS,
+                                BENCHMARK_REGRESSION_THRESHOLD,
+                                BENCHMARK_SAMPLE_SIZE, BENCHMARK_SCALES,
+                                BENCHMARK_SEED, BENCHMARK_WARMUP)
+from recipes.benchmark import DatasetBuilder, benchmark_image
+from recipes.models import Ingredient, Recipe, Tag
+
+PERCENTILES = (50, 90, 99)
+IMAGE = 'data:image/png;base64,' + b64encode(benchmark_image()).decode()
+
+
+def percentile(values, rank):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    return values[max(0, -(-len(values) * rank // 100) - 1)]
+
+
+class Scenarios:
+    """
+    Запросы к горячим эндпоинтам.
+
+    Параметры запросов выбираются генератором с фиксированным зерном,
+    поэтому два прогона на одном наборе данных делают одни и те же
+    запросы.
+    """
+
+    def __init__(self, seed):
+        generator = random.Random(seed)
+        recipe_ids = list(
+            Recipe.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        self.recipe_ids = generator.sample(
+            recipe_ids,
+            min(BENCHMARK_SAMPLE_SIZE, len(recipe_ids)),
+        )
+        self.tag_slugs = list(
+            Tag.objects.order_by('pk').values_list('slug', flat=True)
+        )
+        self.tag_ids = list(
+            Tag.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        ingredients = list(
+            Ingredient.objects.order_by('pk').values_list('pk', 'name')
+        )
+        sample = generator.sample(
+            ingredients,
+            min(BENCHMARK_SAMPLE_SIZE, len(ingredients)),
+        )
+        self.ingredient_ids = [pk for pk, _ in sample]
+        self.prefixes = [name[:3] for _, name in sample]
+
+    def items(self):
+        return (
+            ('recipes-list', self.recipes_list),
+            ('recipes-list-filtered', self.recipes_list_filtered),
+            ('recipes-detail', self.recipes_detail),
+            ('users-subscriptions', self.users_subscriptions),
+            ('ingredients-search', self.ingredients_search),
+            ('recipes-download-shopping-cart', self.download_shopping_cart),
+            ('recipes-create', self.recipes_create),
+        )
+
+    def recipes_list(self, client, step):
+        return client.get('/api/recipes/', {'page': 1 + step % 10}), 200
+
+    def recipes_list_filtered(self, client, step):
+        slugs = self.tag_slugs[step % len(self.tag_slugs):][:2]
+        return client.get(
+            '/api/recipes/',
+            {'tags': slugs, 'is_favorited': 1, 'limit': 12},
+        ), 200
+
+    def recipes_detail(self, client, step):
+        recipe_id = self.recipe_ids[step % len(self.recipe_ids)]
+        return client.get(f'/api/recipes/{recipe_id}/'), 200
+
+    def users_subscriptions(self, client, step):
+        return client.get(
+            '/api/users/subscriptions/',
+            {'recipes_limit': 3},
+        ), 200
+
+    def ingredients_search(self, client, step):
+        return client.get(
+            '/api/ingredients/',
+            {'name': self.prefixes[step % len(self.prefixes)]},
+        ), 200
+
+    def download_shopping_cart(self, client, step):
+        response = client.get('/api/recipes/download_shopping_cart/')
+        b''.join(response.streaming_content)
+        response.close()
+        return response, 200
+
+    def recipes_create(self, client, step):
+        offset = step % len(self.ingredient_ids)
+        return client.post(
+            '/api/recipes/',
+            {
+                'name': f'Рецепт бенчмарка {step}',
+                'text': 'Смешать и запечь.',
+                'cooking_time': 30,
+                'image': IMAGE,
+                'tags': self.tag_ids[:2],
+                'ingredients': [
+                    {'id': pk, 'amount': 10}
+                    for pk in self.ingredient_ids[offset:offset + 5]
+                ],
+            },
+            format='json',
+        ), 201
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк горячих эндпоинтов на детерминированном наборе данных. '
+        'Данные строятся в отдельной тестовой базе, результаты (перцентили '
+        'времени ответа и число SQL-запросов) сохраняются в JSON и '
+        'сравниваются с базовым прогоном.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            choices=BENCHMARK_SCALES,
+            default='1k',
+            help='Число рецептов в наборе данных'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=BENCHMARK_SEED,
+            help='Зерно генератора данных и запросов'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=BENCHMARK_ITERATIONS,
+            help='Число замеряемых запросов к каждому эндпоинту'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=BENCHMARK_WARMUP,
+            help='Число прогревочных запросов перед замерами'
+        )
+        parser.add_argument(
+            '--output',
+            help='Куда сохранить результаты в JSON'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Базовый прогон в JSON для сравнения'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=BENCHMARK_REGRESSION_THRESHOLD,
+            help='Допустимый рост медианы времени ответа, доля'
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Не удалять тестовую базу, чтобы не строить данные заново'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('Нужна хотя бы одна итерация')
+        baseline = self.load_baseline(options)
+        # Отладочные логи SQL и Pillow искажают замеры.
+        logging.disable(logging.INFO)
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0,
+            interactive=False,
+            keepdb=options['keepdb'],
+        )
+        try:
+            with TemporaryDirectory() as directory, override_settings(
+                MEDIA_ROOT=directory,
+                METRICS_DIR=directory,
+                FEED_FANOUT_WORKERS=0,
+                IMAGE_VARIANT_WORKERS=0,
+                CACHES={'default': {
+                    'BACKEND': (
+                        'django.core.cache.backends.filebased.FileBasedCache'
+                    ),
+                    'LOCATION': os.path.join(directory, 'cache'),
+                }},
+            ):
+                results = self.run(options)
+        finally:
+            teardown_databases(old_config, verbosity=0,
+                               keepdb=options['keepdb'])
+            teardown_test_environment()
+            logging.disable(logging.NOTSET)
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+        if baseline:
+            self.compare(baseline, results, options['threshold'])
+
+    def load_baseline(self, options):
+        if not options['baseline']:
+            return None
+        try:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать базовый прогон: {error}')
+        if baseline.get('scale') != options['scale']:
+            raise CommandError(
+                f'Базовый прогон снят на масштабе {baseline.get("scale")}, '
+                f'а не {options["scale"]}'
+            )
+        return baseline
+
+    def run(self, options):
+        started = perf_counter()
+        builder = DatasetBuilder(
+            BENCHMARK_SCALES[options['scale']],
+            options['seed'],
+            log=self.stdout.write,
+        )
+        builder.prepare()
+        self.stdout.write(
+            f'Данные готовы за {perf_counter() - started:.1f} с'
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {builder.token.key}')
+        scenarios = Scenarios(options['seed'])
+        endpoints = {}
+        for name, request in scenarios.items():
+            for step in range(options['warmup']):
+                self.call(name, request, client, step)
+            timings, queries = [], []
+            for step in range(options['iterations']):
+                with CaptureQueriesContext(connection) as captured:
+                    started = perf_counter()
+                    self.call(
+                        name,
+                        request,
+                        client,
+                        options['warmup'] + step,
+                    )
+                    timings.append((perf_counter() - started) * 1000)
+                queries.append(len(captured))
+            timings.sort()
+            endpoints[name] = {
+                **{
+                    f'p{rank}_ms': round(percentile(timings, rank), 3)
+                    for rank in PERCENTILES
+                },
+                'mean_ms': round(mean(timings), 3),
+                'queries': median(queries),
+            }
+        return {
+            'scale': options['scale'],
+            'seed': options['seed'],
+            'recipes': builder.recipes_count,
+            'users': builder.users_count,
+            'iterations': options['iterations'],
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'endpoints': endpoints,
+        }
+
+    def call(self, name, request, client, step):
+        response, expected = request(client, step)
+        if response.status_code != expected:
+            raise CommandError(
+                f'{name}: ответ {response.status_code} вместо {expected}'
+            )
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"эндпоинт":<32}'
+            + ''.join(f'{f"p{rank}, мс":>12}' for rank in PERCENTILES)
+            + f'{"запросов":>10}'
+        )
+        for name, values in results['endpoints'].items():
+            self.stdout.write(
+                f'{name:<32}'
+                + ''.join(
+                    f'{values[f"p{rank}_ms"]:>12.2f}' for rank in PERCENTILES
+                )
+                + f'{values["queries"]:>10g}'
+            )
+
+    def compare(self, baseline, results, threshold):
+        """
+        Сравнивает прогон с базовым.
+
+        Регрессией считается рост медианы времени ответа больше чем на
+        threshold или рост числа SQL-запросов.
+        """
+        regressions = []
+        for name, values in results['endpoints'].items():
+            base = baseline['endpoints'].get(name)
+            if base is None:
+                continue
+            if values['p50_ms'] > base['p50_ms'] * (1 + threshold):
+                regressions.append(
+                    f'{name}: медиана {values["p50_ms"]:.2f} мс '
+                    f'против {base["p50_ms"]:.2f} мс'
+                )
+            if values['queries'] > base['queries']:
+                regressions.append(
+                    f'{name}: SQL-запросов {values["queries"]:g} '
+                    f'против {base["queries"]:g}'
+                )
+        if regressions:
+            raise CommandError(
+                'Регрессия относительно базового прогона:\n'
+                + '\n'.join(regressions)
+            )
+        self.stdout.write(
+            self.style.SUCCESS('Регрессий относительно базового прогона нет')
+        )
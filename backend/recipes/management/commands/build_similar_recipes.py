@@ -0,0 +1,252 @@
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from heapq import nlargest
+from itertools import chain, islice
+from operator import itemgetter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from foodgram.constants import (SIMILAR_MAX_CANDIDATES, SIMILAR_RECIPES_COUNT,
+                                SIMILARITY_CHUNK_SIZE)
+from recipes.models import (Recipe, RecipeIngredient, RecipeSignature,
+                            SimilarRecipe)
+from recipes.similarity import (features_hash, ingredient_feature, lsh_keys,
+                                minhash_many, score_many, tag_feature)
+
+
+def chunks(items, size=SIMILARITY_CHUNK_SIZE):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_features():
+    """Наборы признаков всех рецептов: id ингредиентов и тегов."""
+    features = defaultdict(set)
+    for recipe_id, ingredient_id in (
+        RecipeIngredient.objects.order_by()
+        .values_list('recipe_id', 'ingredient_id')
+        .iterator()
+    ):
+        features[recipe_id].add(ingredient_feature(ingredient_id))
+    for recipe_id, tag_id in (
+        Recipe.tags.through.objects.order_by()
+        .values_list('recipe_id', 'tag_id')
+        .iterator()
+    ):
+        features[recipe_id].add(tag_feature(tag_id))
+    return {
+        recipe_id: frozenset(recipe_features)
+        for recipe_id, recipe_features in features.items()
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчёт похожих рецептов по тегам и ингредиентам. '
+        'Пересчитываются только рецепты, изменившиеся с прошлого запуска, '
+        'и рецепты, на списки которых эти изменения влияют.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Число процессов для расчёта, 0 — в текущем процессе'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать все рецепты'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        self.workers = options['workers']
+        pool = (
+            ProcessPoolExecutor(max_workers=self.workers)
+            if self.workers else None
+        )
+        try:
+            self.features = load_features()
+            changed = self.update_signatures(pool, options['full'])
+            self.build_buckets()
+            affected = (
+                set(self.features) if options['full']
+                else self.affected(changed)
+            )
+            self.update_neighbours(pool, affected)
+        finally:
+            if pool:
+                pool.shutdown()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Изменилось рецептов: {len(changed)}, '
+                f'пересчитано списков похожих: {len(affected)} '
+                f'за {time.monotonic() - started:.1f} с'
+            )
+        )
+
+    def run(self, pool, function, items):
+        """
+        Выполняет function над пачками items, по возможности в пуле.
+
+        Пачки отправляются в пул порциями, чтобы не держать в памяти
+        все задания сразу.
+        """
+        batches = chunks(items)
+        if pool is None:
+            yield from chain.from_iterable(map(function, batches))
+            return
+        for window in chunks(batches, self.workers * 2):
+            yield from chain.from_iterable(pool.map(function, window))
+
+    def update_signatures(self, pool, full):
+        """
+        Пересчитывает подписи рецептов с изменившимся набором признаков.
+
+        Возвращает множество id изменившихся рецептов.
+        """
+        stored = {}
+        self.counts = {}
+        for recipe_id, stored_hash, signature, count in (
+            RecipeSignature.objects
+            .values_list(
+                'recipe_id', 'features_hash', 'minhash', 'neighbours_count',
+            )
+            .iterator()
+        ):
+            stored[recipe_id] = (stored_hash, bytes(signature))
+            self.counts[recipe_id] = count
+
+        hashes = {
+            recipe_id: features_hash(recipe_features)
+            for recipe_id, recipe_features in self.features.items()
+        }
+        changed = {
+            recipe_id for recipe_id, value in hashes.items()
+            if full or stored.get(recipe_id, (None,))[0] != value
+        }
+        fresh = dict(self.run(pool, minhash_many, [
+            (recipe_id, self.features[recipe_id]) for recipe_id in changed
+        ]))
+        stale = stored.keys() - hashes.keys()
+        for batch in chunks(changed | stale):
+            with transaction.atomic():
+                RecipeSignature.objects.filter(recipe__in=batch).delete()
+                RecipeSignature.objects.bulk_create([
+                    RecipeSignature(
+                        recipe_id=recipe_id,
+                        features_hash=hashes[recipe_id],
+                        minhash=fresh[recipe_id],
+                    )
+                    for recipe_id in batch if recipe_id in fresh
+                ])
+        self.signatures = {
+            recipe_id: fresh.get(recipe_id) or stored[recipe_id][1]
+            for recipe_id in hashes
+        }
+        return changed
+
+    def build_buckets(self):
+        self.buckets = defaultdict(list)
+        for recipe_id, signature in self.signatures.items():
+            for key in lsh_keys(signature):
+                self.buckets[key].append(recipe_id)
+
+    def candidates(self, recipe_id):
+        """
+        Кандидаты в похожие, не больше SIMILAR_MAX_CANDIDATES.
+
+        Число общих корзин растёт вместе с оценкой Жаккара по подписям,
+        поэтому при переполнении остаются кандидаты с наибольшим числом
+        совпавших полос; при равенстве предпочитаются новые рецепты.
+        """
+        collisions = Counter()
+        for key in lsh_keys(self.signatures[recipe_id]):
+            collisions.update(self.buckets[key])
+        del collisions[recipe_id]
+        return [
+            candidate_id for candidate_id, _ in nlargest(
+                SIMILAR_MAX_CANDIDATES,
+                collisions.items(),
+                key=itemgetter(1, 0),
+            )
+        ]
+
+    def affected(self, changed):
+        """
+        Рецепты, списки похожих которых нужно пересчитать.
+
+        Это изменившиеся рецепты, их кандидаты, рецепты, у которых они
+        были в списке, и рецепты, потерявшие соседей из-за удаления.
+        """
+        affected = set(changed)
+        for recipe_id in changed:
+            affected.update(self.candidates(recipe_id))
+        for batch in chunks(changed):
+            affected.update(
+                SimilarRecipe.objects.filter(similar__in=batch)
+                .values_list('recipe_id', flat=True)
+            )
+        actual = dict(
+            SimilarRecipe.objects.order_by()
+            .values('recipe')
+            .annotate(total=Count('pk'))
+            .values_list('recipe', 'total')
+        )
+        affected.update(
+            recipe_id for recipe_id, count in self.counts.items()
+            if actual.get(recipe_id, 0) < count
+        )
+        return affected & self.features.keys()
+
+    def tasks(self, affected):
+        for recipe_id in sorted(affected):
+            yield (
+                recipe_id,
+                self.features[recipe_id],
+                [
+                    (candidate_id, self.features[candidate_id])
+                    for candidate_id in self.candidates(recipe_id)
+                ],
+            )
+
+    def update_neighbours(self, pool, affected):
+        results = self.run(
+            pool,
+            partial(score_many, count=SIMILAR_RECIPES_COUNT),
+            self.tasks(affected),
+        )
+        for batch in chunks(results):
+            with transaction.atomic():
+                self.save_neighbours(batch)
+
+    def save_neighbours(self, batch):
+        recipe_ids = [recipe_id for recipe_id, _ in batch]
+        SimilarRecipe.objects.filter(recipe__in=recipe_ids).delete()
+        SimilarRecipe.objects.bulk_create([
+            SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                          score=score)
+            for recipe_id, neighbours in batch
+            for similar_id, score in neighbours
+        ])
+        RecipeSignature.objects.bulk_update(
+            [
+                RecipeSignature(
+                    recipe_id=recipe_id,
+                    neighbours_count=len(neighbours),
+                )
+                for recipe_id, neighbours in batch
+            ],
+            ['neighbours_count'],
+        )
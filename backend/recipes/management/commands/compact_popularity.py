@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from foodgram.constants import (POPULARITY_DAY_RETENTION,
+                                POPULARITY_HOUR_RETENTION)
+from recipes.models import PopularityBucket
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаление устаревших интервалов счётчиков популярности: '
+        'часовых старше POPULARITY_HOUR_RETENTION, дневных старше '
+        'POPULARITY_DAY_RETENTION и пустых'
+    )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted, _ = PopularityBucket.objects.filter(
+            Q(
+                period=PopularityBucket.HOUR,
+                start__lt=now - POPULARITY_HOUR_RETENTION,
+            )
+            | Q(
+                period=PopularityBucket.DAY,
+                start__lt=now - POPULARITY_DAY_RETENTION,
+            )
+            | Q(score__lte=0)
+        ).delete()
+        self.stdout.write(
+            self.style.SUCCESS(f'Удалено интервалов: {deleted}')
+        )
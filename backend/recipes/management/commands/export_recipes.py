@@ -0,0 +1,44 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from foodgram.constants import RECIPE_TRANSFER_BATCH_SIZE
+from recipes.transfer import iter_recipe_records
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка рецептов в файл JSONL, по одному рецепту в строке'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            type=str,
+            default='-',
+            help='Путь до файла, по умолчанию стандартный вывод'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RECIPE_TRANSFER_BATCH_SIZE,
+            help='Сколько рецептов читать из базы за раз'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        output = (
+            sys.stdout if path == '-'
+            else open(path, 'w', encoding='utf-8')
+        )
+        exported = 0
+        try:
+            for record in iter_recipe_records(options['batch_size']):
+                output.write(json.dumps(record, ensure_ascii=False))
+                output.write('\n')
+                exported += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(
+            self.style.SUCCESS(f'Выгружено {exported} рецептов')
+        )
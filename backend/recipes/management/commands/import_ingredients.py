@@ -1,14 +1,170 @@
 import csv
+import json
 import os
+import time
+from collections import Counter
+from itertools import islice
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
-from recipes.models import Ingredient
+from api.cache import bump_data_version
+from foodgram.constants import (IMPORT_READ_CHUNK_SIZE,
+                                INGREDIENT_IMPORT_BATCH_SIZE)
+from recipes.models import Ingredient, RecipeIngredient
+
+
+def iter_csv(file):
+    for row in csv.reader(file):
+        if len(row) != 2:
+            yield row
+            continue
+        yield [value.strip() for value in row]
+
+
+def json_row(item):
+    if not isinstance(item, dict):
+        return [item]
+    return [
+        str(item.get('name', '')).strip(),
+        str(item.get('measurement_unit', '')).strip(),
+    ]
+
+
+def iter_json(file):
+    """
+    Читает массив JSON по одному элементу, не загружая файл целиком.
+
+    Элемент {"name": ..., "measurement_unit": ...} превращается в
+    строку [name, measurement_unit].
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, started = '', 0, False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position < len(buffer) and not started:
+            if buffer[position] != '[':
+                raise CommandError('Ожидался массив JSON')
+            started = True
+            position += 1
+            continue
+        if buffer[position:position + 1] == ']':
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except ValueError:
+            chunk = file.read(IMPORT_READ_CHUNK_SIZE)
+            if not chunk:
+                if buffer[position:].strip():
+                    raise CommandError('Файл JSON оборван')
+                return
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield json_row(item)
+
+
+class IngredientSync:
+    """
+    Сверка строк файла с ингредиентами в базе.
+
+    Ингредиент ищется по названию и единице измерения: при совпадении
+    строка пропускается. Если в базе один ингредиент с этим названием,
+    а в файле название встречается один раз, единица обновляется —
+    но только когда ингредиент не используется в рецептах, иначе
+    строка попадает в конфликты. В остальных случаях ингредиент
+    создаётся.
+    """
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.invalid = []
+        self.conflicts = []
+        self.seen = set()
+        self.seen_names = set()
+        self.units = {}
+
+    def rows(self, batch):
+        """Отбрасывает некорректные и повторяющиеся строки."""
+        for row in batch:
+            if len(row) != 2 or not all(row):
+                self.invalid.append(row)
+            elif tuple(row) in self.seen:
+                self.duplicates += 1
+            else:
+                self.seen.add(tuple(row))
+                yield tuple(row)
+
+    def plan(self, batch):
+        rows = list(self.rows(batch))
+        names = Counter(name for name, _ in rows)
+        existing = {}
+        for pk, name, unit in Ingredient.objects.filter(
+            name__in=names,
+        ).values_list('pk', 'name', 'measurement_unit'):
+            # При пробном запуске учитываются изменения прошлых пачек.
+            existing.setdefault(name, {})[self.units.get(pk, unit)] = pk
+
+        inserts, updates = [], []
+        for name, unit in rows:
+            units = existing.get(name, {})
+            if unit in units:
+                self.skipped += 1
+            elif (
+                len(units) == 1
+                and names[name] == 1
+                and name not in self.seen_names
+            ):
+                (old_unit, pk), = units.items()
+                updates.append((pk, name, old_unit, unit))
+            else:
+                inserts.append((name, unit))
+        self.seen_names.update(names)
+
+        used = set(
+            RecipeIngredient.objects.filter(
+                ingredient__in=[pk for pk, *_ in updates],
+            ).values_list('ingredient_id', flat=True).distinct()
+        ) if updates else set()
+        self.conflicts += [update for update in updates if update[0] in used]
+        updates = [update for update in updates if update[0] not in used]
+        self.units.update((pk, unit) for pk, _, _, unit in updates)
+        return inserts, updates
+
+    @transaction.atomic
+    def apply(self, inserts, updates):
+        Ingredient.objects.bulk_create([
+            Ingredient(name=name, measurement_unit=unit)
+            for name, unit in inserts
+        ])
+        Ingredient.objects.bulk_update(
+            [
+                Ingredient(pk=pk, name=name, measurement_unit=unit)
+                for pk, name, _, unit in updates
+            ],
+            ['measurement_unit'],
+        )
+
+    def sync(self, batch):
+        """Сверяет пачку строк и возвращает добавления и обновления."""
+        inserts, updates = self.plan(batch)
+        if not self.dry_run:
+            self.apply(inserts, updates)
+        self.inserted += len(inserts)
+        self.updated += len(updates)
+        return inserts, updates
 
 
 class Command(BaseCommand):
-    help = 'Импорт ингредиентов из data/ingredients.csv'
+    help = (
+        'Импорт ингредиентов из data/ingredients.csv или '
+        'data/ingredients.json с обновлением единиц измерения'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -20,7 +176,18 @@ class Command(BaseCommand):
                 'data',
                 'ingredients.csv'
             ),
-            help='Путь до файла ingredients.csv'
+            help='Путь до файла ingredients.csv или ingredients.json'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=INGREDIENT_IMPORT_BATCH_SIZE,
+            help='Сколько строк сверять и записывать за раз'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать изменения, ничего не записывая'
         )
 
     def handle(self, *args, **options):
@@ -31,27 +198,45 @@ class Command(BaseCommand):
             )
             return
 
-        with open(path, encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            ingredients = []
-            for row in reader:
-                try:
-                    name, measurement_unit = row
-                    ingredients.append(Ingredient(
-                        name=name.strip(),
-                        measurement_unit=measurement_unit.strip()
-                    ))
-                except ValueError:
-                    self.stdout.write(
-                        self.style.WARNING(f'Пропущена строка: {row}')
-                    )
-
-        Ingredient.objects.bulk_create(
-            ingredients,
-            ignore_conflicts=True
-        )
+        reader = iter_json if path.endswith('.json') else iter_csv
+        sync = IngredientSync(dry_run=options['dry_run'])
+        started = time.monotonic()
+        with open(path, encoding='utf-8') as file:
+            rows = reader(file)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                inserts, updates = sync.sync(batch)
+                if sync.dry_run:
+                    self.write_diff(inserts, updates)
+
+        if not sync.dry_run and (sync.inserted or sync.updated):
+            bump_data_version('ingredients')
+        for row in sync.invalid:
+            self.stdout.write(
+                self.style.WARNING(f'Пропущена строка: {row}')
+            )
+        for _, name, old_unit, unit in sync.conflicts:
+            self.stdout.write(self.style.WARNING(
+                f'Единица не изменена, ингредиент есть в рецептах: '
+                f'{name}: {old_unit} -> {unit}'
+            ))
         self.stdout.write(
             self.style.SUCCESS(
-                f'Импортировано {len(ingredients)} ингредиентов'
+                f'{"Пробный запуск: " if sync.dry_run else ""}'
+                f'добавлено {sync.inserted}, '
+                f'обновлено {sync.updated}, '
+                f'без изменений {sync.skipped}, '
+                f'повторов {sync.duplicates}, '
+                f'конфликтов {len(sync.conflicts)}, '
+                f'с ошибками {len(sync.invalid)} '
+                f'за {time.monotonic() - started:.2f} с'
             )
         )
+
+    def write_diff(self, inserts, updates):
+        for name, unit in inserts:
+            self.stdout.write(f'+ {name} ({unit})')
+        for _, name, old_unit, unit in updates:
+            self.stdout.write(f'~ {name}: {old_unit} -> {unit}')
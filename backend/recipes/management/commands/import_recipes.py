@@ -0,0 +1,111 @@
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.constants import (RECIPE_IMAGE_COPY_WORKERS,
+                                RECIPE_TRANSFER_BATCH_SIZE)
+from recipes.transfer import RecipeImporter
+
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, encoding='utf-8') as file:
+        return int(file.read().strip() or 0)
+
+
+def write_checkpoint(path, line):
+    if not path:
+        return
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+        file.write(str(line))
+    os.replace(f'{path}.tmp', path)
+
+
+def iter_records(file, start):
+    for number, line in enumerate(file, start=1):
+        if number <= start or not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            raise CommandError(f'Строка {number}: {error}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Загрузка рецептов из файла JSONL, выгруженного export_recipes. '
+        'Рецепты пишутся пачками, прогресс сохраняется в файл контрольной '
+        'точки, и прерванную загрузку можно продолжить. Записи, '
+        'конфликтующие с базой или друг с другом, не загружаются и '
+        'выводятся в stderr.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            type=str,
+            help='Путь до файла JSONL'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RECIPE_TRANSFER_BATCH_SIZE,
+            help='Сколько рецептов записывать за одну транзакцию'
+        )
+        parser.add_argument(
+            '--media-from',
+            type=str,
+            help='Каталог media исходной установки для копирования картинок'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=RECIPE_IMAGE_COPY_WORKERS,
+            help='Число потоков копирования картинок, 0 — без потоков'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            help='Файл с номером последней загруженной строки'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Файл не найден: {path}')
+        checkpoint = options['checkpoint']
+        start = read_checkpoint(checkpoint)
+        importer = RecipeImporter(
+            media_from=options['media_from'],
+            workers=options['workers'],
+        )
+        started = time.monotonic()
+        with open(path, encoding='utf-8') as file:
+            records = iter_records(file, start)
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+                reported = len(importer.conflicts)
+                importer.import_batch([record for _, record in batch])
+                write_checkpoint(checkpoint, batch[-1][0])
+                for message in importer.conflicts[reported:]:
+                    self.stderr.write(f'Конфликт: {message}')
+                self.stdout.write(
+                    f'Строка {batch[-1][0]}: загружено {importer.created}, '
+                    f'пропущено {importer.skipped}, '
+                    f'конфликтов {len(importer.conflicts)}'
+                )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Загружено {importer.created} рецептов, '
+                f'пропущено {importer.skipped}, '
+                f'конфликтов {len(importer.conflicts)}, '
+                f'нет картинок {importer.missing_images}, '
+                f'за {time.monotonic() - started:.1f} с'
+            )
+        )
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import (Favorite, Recipe, ShoppingCart,
+                            ShoppingCartIngredient)
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def count_subquery(model, field):
+    """Число связанных записей model, у которых field ссылается на объект."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчёт счётчиков избранного, покупок, рецептов, подписчиков '
+        'и сумм ингредиентов в списках покупок'
+    )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.update(
+            favorites_count=count_subquery(Favorite, 'recipe'),
+            shopping_carts_count=count_subquery(ShoppingCart, 'recipe'),
+        )
+        users = User.objects.update(
+            recipes_count=count_subquery(Recipe, 'author'),
+            subscribers_count=count_subquery(Subscription, 'author'),
+        )
+        totals = ShoppingCartIngredient.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Пересчитаны счётчики: рецептов {recipes}, '
+                f'пользователей {users}, '
+                f'сумм в списках покупок {totals}'
+            )
+        )
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+INDEX_NAME = 'ingredient_lower_name_idx'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        expression = 'lower(name) varchar_pattern_ops'
+    else:
+        expression = 'lower(name)'
+    schema_editor.execute(
+        f'CREATE INDEX {INDEX_NAME} ON recipes_ingredient ({expression})'
+    )
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute(f'DROP INDEX {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
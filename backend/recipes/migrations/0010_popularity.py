@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+# POPULARITY_ALL_START на момент миграции.
+POPULARITY_ALL_START = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def fill_all_time(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    PopularityBucket = apps.get_model('recipes', 'PopularityBucket')
+    PopularityBucket.objects.bulk_create(
+        [
+            PopularityBucket(
+                recipe_id=recipe_id,
+                period='all',
+                start=POPULARITY_ALL_START,
+                score=score,
+            )
+            for recipe_id, score in Recipe.objects.annotate(
+                total=F('favorites_count') + F('shopping_carts_count'),
+            ).filter(total__gt=0).values_list('pk', 'total').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_similar_recipes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='PopularityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Час'), ('day', 'День'), ('all', 'Всё время')], max_length=4, verbose_name='Интервал')),
+                ('start', models.DateTimeField(verbose_name='Начало интервала')),
+                ('score', models.IntegerField(default=0, verbose_name='Добавлений')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='popularity_buckets', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Счётчик популярности',
+                'verbose_name_plural': 'Счётчики популярности',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='popularitybucket',
+            index=models.Index(fields=['period', 'start'], name='popularity_period_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='popularitybucket',
+            index=models.Index(fields=['period', '-score'], name='popularity_period_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='popularitybucket',
+            constraint=models.UniqueConstraint(fields=('recipe', 'period', 'start'), name='unique_popularity_bucket'),
+        ),
+        migrations.RunPython(fill_all_time, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:08
+
+import posixpath
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+# Последняя создаваемая копия на момент миграции: по ней судили о
+# готовности копий до появления поля.
+LAST_VARIANT = 'detail.jpeg'
+
+
+def last_variant(name):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'variants', f'{stem}_{LAST_VARIANT}')
+
+
+def mark_ready(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    ready = []
+    for pk, name in Recipe.objects.exclude(image='').exclude(
+        image__isnull=True,
+    ).values_list('pk', 'image').iterator():
+        if default_storage.exists(last_variant(name)):
+            ready.append(Recipe(pk=pk, image_variants_for=name))
+    Recipe.objects.bulk_update(ready, ['image_variants_for'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_feed_entries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants_for',
+            field=models.CharField(blank=True, editable=False, help_text='Путь картинки, для которой созданы уменьшенные копии.', max_length=100, verbose_name='Картинка с готовыми копиями'),
+        ),
+        migrations.RunPython(mark_ready, migrations.RunPython.noop),
+    ]
@@ -1,16 +1,28 @@
+from datetime import timedelta
+from heapq import merge
+
 import shortuuid
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Exists, Manager, OuterRef
+from django.db import connection, models
+from django.db.models import (Case, Exists, F, Manager, OuterRef, Prefetch, Q,
+                              Subquery, Sum, Value, When, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.utils import timezone
 
 from foodgram.constants import (COOKING_TIME_MAX, COOKING_TIME_MIN,
+                                FEED_BACKFILL_COUNT, FEED_FANOUT_BATCH_SIZE,
+                                FEED_FANOUT_MAX_SUBSCRIBERS,
                                 INGREDIENT_MAX_AMOUNT,
                                 INGREDIENT_MEASURE_MAX_LENGTH,
                                 INGREDIENT_MIN_AMOUNT,
-                                INGREDIENT_NAME_MAX_LENGTH,
+                                INGREDIENT_NAME_MAX_LENGTH, MD5_HEX_LENGTH,
+                                POPULARITY_ALL_START,
+                                POPULARITY_PERIOD_MAX_LENGTH,
                                 RECIPE_NAME_MAX_LENGTH, TAG_NAME_MAX_LENGTH,
                                 UUID_MAX_LENGTH)
+from users.models import Subscription
 
 User = get_user_model()
 
@@ -38,6 +50,327 @@ class RecipeManager(Manager):
             is_in_shopping_cart=Exists(cart_subquery),
         )
 
+    def for_read(self, user):
+        """
+        Рецепты для чтения с фиксированным числом запросов.
+
+        Автор подтягивается через JOIN, теги и ингредиенты — двумя
+        prefetch-запросами на всю страницу, подписка на автора
+        вычисляется аннотацией.
+        """
+        if user.is_authenticated:
+            subscription = Exists(Subscription.objects.filter(
+                user=user,
+                author=OuterRef('author'),
+            ))
+        else:
+            subscription = Exists(Subscription.objects.none())
+
+        return self.with_user_annotations(user).annotate(
+            author_is_subscribed=subscription,
+        ).select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient',
+                ),
+            ),
+        )
+
+    def latest_by_author(self, author_ids, limit=None):
+        """
+        Последние рецепты нескольких авторов одним запросом.
+
+        Не более limit рецептов на автора отбираются оконной функцией
+        ROW_NUMBER, а на базах без её поддержки — коррелированным
+        подзапросом.
+        """
+        queryset = self.get_queryset().filter(author__in=author_ids)
+        if limit is None:
+            return queryset
+
+        if not connection.features.supports_over_clause:
+            return queryset.filter(pk__in=Subquery(
+                self.get_queryset().filter(
+                    author=OuterRef('author'),
+                ).values('pk')[:limit]
+            ))
+
+        ranked = queryset.annotate(
+            recipe_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('author')],
+                order_by=[F('pub_date').desc(), F('id').desc()],
+            ),
+        ).order_by().values('pk', 'recipe_rank')
+        sql, params = ranked.query.sql_with_params()
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) AS ranked '
+            f'WHERE ranked.recipe_rank <= %s',
+            (*params, limit),
+        ))
+
+
+class ShoppingCartIngredientManager(Manager):
+    """Менеджер сумм ингредиентов в списках покупок."""
+
+    def apply_changes(self, user_ids, changes):
+        """
+        Прибавляет к суммам пользователей изменения количеств.
+
+        changes — словарь {id ингредиента: изменение количества}.
+        Недостающие строки создаются, обнулившиеся удаляются.
+        """
+        user_ids = list(user_ids)
+        changes = {
+            ingredient_id: delta
+            for ingredient_id, delta in changes.items()
+            if delta
+        }
+        if not user_ids or not changes:
+            return
+
+        self.bulk_create(
+            [
+                self.model(user_id=user_id, ingredient_id=ingredient_id)
+                for user_id in user_ids
+                for ingredient_id, delta in changes.items()
+                if delta > 0
+            ],
+            ignore_conflicts=True,
+        )
+        totals = self.filter(user__in=user_ids, ingredient__in=changes)
+        totals.update(amount=F('amount') + Case(
+            *[
+                When(ingredient=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in changes.items()
+            ],
+            default=Value(0),
+        ))
+        totals.filter(amount__lte=0).delete()
+
+    def add_recipe(self, user_ids, recipe, sign=1):
+        """Добавляет (sign=-1 — убирает) ингредиенты рецепта в суммы."""
+        self.apply_changes(user_ids, {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in recipe.ingredients.values_list(
+                'ingredient_id',
+                'amount',
+            )
+        })
+
+    def rebuild(self, batch_size=1000):
+        """Пересчитывает все суммы заново по текущим спискам покупок."""
+        self.all().delete()
+        totals = (
+            ShoppingCart.objects
+            .filter(recipe__ingredients__isnull=False)
+            .values('user', 'recipe__ingredients__ingredient')
+            .annotate(total=Sum('recipe__ingredients__amount'))
+            .order_by()
+        )
+        return len(self.bulk_create(
+            [
+                self.model(
+                    user_id=row['user'],
+                    ingredient_id=row['recipe__ingredients__ingredient'],
+                    amount=row['total'],
+                )
+                for row in totals.iterator()
+            ],
+            batch_size=batch_size,
+        ))
+
+    def update_recipe(self, recipe, old_amounts, new_amounts):
+        """Переносит изменение ингредиентов рецепта в суммы покупателей."""
+        self.apply_changes(
+            recipe.shoppingcart_set.values_list('user_id', flat=True),
+            {
+                ingredient_id: (
+                    new_amounts.get(ingredient_id, 0)
+                    - old_amounts.get(ingredient_id, 0)
+                )
+                for ingredient_id in old_amounts.keys() | new_amounts.keys()
+            },
+        )
+
+
+def popularity_bucket_starts(moment):
+    """Начала часового, дневного и общего интервалов для момента времени."""
+    hour = moment.astimezone(timezone.utc).replace(
+        minute=0,
+        second=0,
+        microsecond=0,
+    )
+    return {
+        PopularityBucket.HOUR: hour,
+        PopularityBucket.DAY: hour.replace(hour=0),
+        PopularityBucket.ALL: POPULARITY_ALL_START,
+    }
+
+
+class PopularityBucketManager(Manager):
+    """Менеджер счётчиков популярности рецептов по интервалам времени."""
+
+    def record(self, recipe_id, created_at, delta):
+        """
+        Прибавляет delta к счётчикам интервалов, в которые попал created_at.
+
+        При уменьшении недостающие строки не создаются: интервал уже
+        удалён при сжатии и в окна популярности не входит.
+        """
+        starts = popularity_bucket_starts(created_at)
+        if delta > 0:
+            self.bulk_create(
+                [
+                    self.model(recipe_id=recipe_id, period=period, start=start)
+                    for period, start in starts.items()
+                ],
+                ignore_conflicts=True,
+            )
+        periods = Q()
+        for period, start in starts.items():
+            periods |= Q(period=period, start=start)
+        self.filter(periods, recipe_id=recipe_id).update(
+            score=F('score') + delta,
+        )
+
+    def top(self, window, limit):
+        """Список (id рецепта, счёт) лучших рецептов за окно window."""
+        if window == 'all':
+            rows = self.filter(period=self.model.ALL, score__gt=0).order_by(
+                '-score',
+                '-recipe_id',
+            ).values_list('recipe_id', 'score')
+            return list(rows[:limit])
+
+        now = popularity_bucket_starts(timezone.now())
+        if window == 'day':
+            period = self.model.HOUR
+            since = now[period] - timedelta(hours=23)
+        else:
+            period = self.model.DAY
+            since = now[period] - timedelta(days=6)
+        rows = (
+            self.filter(period=period, start__gte=since)
+            .values('recipe_id')
+            .annotate(total=Sum('score'))
+            .filter(total__gt=0)
+            .order_by('-total', '-recipe_id')
+            .values_list('recipe_id', 'total')
+        )
+        return list(rows[:limit])
+
+
+class FeedEntryManager(Manager):
+    """Менеджер записей лент подписок."""
+
+    def fan_out(self, recipe_id):
+        """
+        Добавляет рецепт в ленты подписчиков автора пачками.
+
+        Рецепты авторов, у которых больше FEED_FANOUT_MAX_SUBSCRIBERS
+        подписчиков, не рассылаются: автор навсегда помечается feed_pulled,
+        и ленты читают его рецепты из таблицы рецептов. Возвращает число
+        подписчиков, получивших рецепт.
+        """
+        recipe = Recipe.objects.filter(pk=recipe_id).values(
+            'author_id',
+            'pub_date',
+            'author__subscribers_count',
+            'author__feed_pulled',
+        ).first()
+        if recipe is None or recipe['author__feed_pulled']:
+            return 0
+        if recipe['author__subscribers_count'] > FEED_FANOUT_MAX_SUBSCRIBERS:
+            User.objects.filter(
+                pk=recipe['author_id'],
+            ).update(feed_pulled=True)
+            return 0
+        subscriptions = Subscription.objects.filter(
+            author_id=recipe['author_id'],
+        ).order_by('pk')
+        last_pk = 0
+        total = 0
+        while True:
+            batch = list(
+                subscriptions.filter(pk__gt=last_pk)
+                .values_list('pk', 'user_id')[:FEED_FANOUT_BATCH_SIZE]
+            )
+            if not batch:
+                return total
+            self.bulk_create(
+                [
+                    self.model(
+                        user_id=user_id,
+                        recipe_id=recipe_id,
+                        author_id=recipe['author_id'],
+                        pub_date=recipe['pub_date'],
+                    )
+                    for _, user_id in batch
+                ],
+                ignore_conflicts=True,
+            )
+            last_pk = batch[-1][0]
+            total += len(batch)
+
+    def backfill(self, user_id, author_id):
+        """Добавляет в ленту последние рецепты автора после подписки."""
+        self.bulk_create(
+            [
+                self.model(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+                for recipe_id, pub_date in Recipe.objects.filter(
+                    author_id=author_id,
+                ).order_by('-pub_date', '-id').values_list(
+                    'pk',
+                    'pub_date',
+                )[:FEED_BACKFILL_COUNT]
+            ],
+            ignore_conflicts=True,
+        )
+
+    def recipe_ids(self, user, position, limit):
+        """
+        id рецептов ленты пользователя от новых к старым.
+
+        Записи ленты читаются по индексу (user, pub_date, recipe), рецепты
+        авторов с большим числом подписчиков и авторов, чьи рецепты уже
+        не рассылаются, — из таблицы рецептов, и обе выборки сливаются.
+        position — (pub_date, id) последнего рецепта предыдущей страницы.
+        """
+        entries = self.filter(user=user)
+        pulled = Recipe.objects.filter(author__in=Subscription.objects.filter(
+            Q(author__feed_pulled=True)
+            | Q(author__subscribers_count__gt=FEED_FANOUT_MAX_SUBSCRIBERS),
+            user=user,
+        ).values('author'))
+        if position:
+            pub_date, pk = position
+            entries = entries.filter(
+                Q(pub_date__lt=pub_date)
+                | Q(pub_date=pub_date, recipe_id__lt=pk)
+            )
+            pulled = pulled.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        recipe_ids = []
+        for _, recipe_id in merge(
+            entries.order_by('-pub_date', '-recipe_id')
+            .values_list('pub_date', 'recipe_id')[:limit],
+            pulled.order_by('-pub_date', '-id')
+            .values_list('pub_date', 'id')[:limit],
+            reverse=True,
+        ):
+            if not recipe_ids or recipe_ids[-1] != recipe_id:
+                recipe_ids.append(recipe_id)
+        return recipe_ids[:limit]
+
 
 class Tag(models.Model):
     """Модель тега."""
@@ -109,6 +442,13 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         verbose_name='Картинка',
     )
+    image_variants_for = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name='Картинка с готовыми копиями',
+        help_text='Путь картинки, для которой созданы уменьшенные копии.',
+    )
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления (мин)',
         validators=[
@@ -149,11 +489,27 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации',
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в избранное',
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в список покупок',
+    )
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -223,6 +579,10 @@ class UserRecipeRelation(models.Model):
         related_name='%(class)s_set',
         verbose_name='Рецепт',
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата добавления',
+    )
 
     class Meta:
         abstract = True
@@ -237,6 +597,8 @@ class UserRecipeRelation(models.Model):
 class Favorite(UserRecipeRelation):
     """Модель избранного рецепта."""
 
+    counter_field = 'favorites_count'
+
     class Meta(UserRecipeRelation.Meta):
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
@@ -248,9 +610,220 @@ class Favorite(UserRecipeRelation):
 class ShoppingCart(UserRecipeRelation):
     """Модель списка покупок."""
 
+    counter_field = 'shopping_carts_count'
+
     class Meta(UserRecipeRelation.Meta):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
 
     def __str__(self):
         return f'{self.user} → {self.recipe}'
+
+
+class ShoppingCartIngredient(models.Model):
+    """Сумма ингредиента по всем рецептам в списке покупок."""
+
+    objects = ShoppingCartIngredientManager()
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_totals',
+        verbose_name='Ингредиент',
+    )
+    amount = models.IntegerField(
+        default=0,
+        verbose_name='Количество',
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_cart_ingredient',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} — {self.amount}'
+
+
+class RecipeSignature(models.Model):
+    """MinHash-подпись набора тегов и ингредиентов рецепта."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='Рецепт',
+    )
+    features_hash = models.CharField(
+        max_length=MD5_HEX_LENGTH,
+        verbose_name='Хэш набора признаков',
+    )
+    minhash = models.BinaryField(verbose_name='Подпись MinHash')
+    neighbours_count = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Число похожих рецептов',
+    )
+
+    class Meta:
+        verbose_name = 'Подпись рецепта'
+        verbose_name_plural = 'Подписи рецептов'
+
+    def __str__(self):
+        return f'Подпись {self.recipe_id}'
+
+
+class SimilarRecipe(models.Model):
+    """Похожий рецепт, найденный командой build_similar_recipes."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        ordering = ['-score', 'id']
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} ≈ {self.similar}'
+
+
+class PopularityBucket(models.Model):
+    """
+    Счётчик добавлений рецепта в избранное и списки покупок за интервал.
+
+    Часовые интервалы дают окно «день», дневные — окно «неделя», общий
+    счётчик — окно «всё время». Старые интервалы удаляет команда
+    compact_popularity.
+    """
+
+    HOUR = 'hour'
+    DAY = 'day'
+    ALL = 'all'
+    PERIODS = (
+        (HOUR, 'Час'),
+        (DAY, 'День'),
+        (ALL, 'Всё время'),
+    )
+
+    objects = PopularityBucketManager()
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='popularity_buckets',
+        verbose_name='Рецепт',
+    )
+    period = models.CharField(
+        max_length=POPULARITY_PERIOD_MAX_LENGTH,
+        choices=PERIODS,
+        verbose_name='Интервал',
+    )
+    start = models.DateTimeField(verbose_name='Начало интервала')
+    score = models.IntegerField(default=0, verbose_name='Добавлений')
+
+    class Meta:
+        verbose_name = 'Счётчик популярности'
+        verbose_name_plural = 'Счётчики популярности'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'period', 'start'],
+                name='unique_popularity_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['period', 'start'],
+                name='popularity_period_start_idx',
+            ),
+            models.Index(
+                fields=['period', '-score'],
+                name='popularity_period_score_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe}: {self.period} {self.start} — {self.score}'
+
+
+class FeedEntry(models.Model):
+    """
+    Запись ленты подписок: рецепт автора, на которого подписан пользователь.
+
+    Записи создаются при публикации рецепта (рассылка в ленты подписчиков)
+    и при подписке. Дата публикации хранится здесь же, чтобы страница
+    ленты читалась одним проходом по индексу.
+    """
+
+    objects = FeedEntryManager()
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_user_author_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
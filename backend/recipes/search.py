@@ -0,0 +1,110 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+WORD = re.compile(r'\w+')
+
+POSTGRES_QUERY = "plainto_tsquery('pg_catalog.russian', %s)"
+POSTGRES_MATCH = f'"recipes_recipe"."search_vector" @@ {POSTGRES_QUERY}'
+POSTGRES_RANK = f'ts_rank("recipes_recipe"."search_vector", {POSTGRES_QUERY})'
+
+SQLITE_MATCH = (
+    '"recipes_recipe"."id" IN ('
+    'SELECT rowid FROM recipes_recipe_fts WHERE recipes_recipe_fts MATCH %s)'
+)
+# bm25 возвращает тем меньшее число, чем лучше совпадение,
+# название весит больше описания.
+SQLITE_RANK = (
+    '(SELECT -bm25(recipes_recipe_fts, 10.0, 1.0) FROM recipes_recipe_fts '
+    'WHERE recipes_recipe_fts MATCH %s AND rowid = "recipes_recipe"."id")'
+)
+
+
+SQLITE_TRIGGERS = {
+    'recipes_recipe_fts_insert': """
+        AFTER INSERT ON recipes_recipe
+        BEGIN
+            INSERT INTO recipes_recipe_fts (rowid, name, text)
+            VALUES (new.id, new.name, new.text);
+        END
+    """,
+    'recipes_recipe_fts_delete': """
+        AFTER DELETE ON recipes_recipe
+        BEGIN
+            INSERT INTO recipes_recipe_fts
+                (recipes_recipe_fts, rowid, name, text)
+            VALUES ('delete', old.id, old.name, old.text);
+        END
+    """,
+    'recipes_recipe_fts_update': """
+        AFTER UPDATE OF name, text ON recipes_recipe
+        BEGIN
+            INSERT INTO recipes_recipe_fts
+                (recipes_recipe_fts, rowid, name, text)
+            VALUES ('delete', old.id, old.name, old.text);
+            INSERT INTO recipes_recipe_fts (rowid, name, text)
+            VALUES (new.id, new.name, new.text);
+        END
+    """,
+}
+
+
+def restore_sqlite_triggers(connection):
+    """
+    Восстанавливает недостающие триггеры FTS5 и перестраивает индекс.
+
+    SQLite-миграции Django пересоздают таблицу рецептов при изменении
+    полей, и её триггеры пропадают, поэтому функция вызывается после
+    каждой миграции.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE name LIKE 'recipes_recipe_fts%'"
+        )
+        names = {name for name, in cursor.fetchall()}
+        if 'recipes_recipe_fts' not in names:
+            return
+        if names >= SQLITE_TRIGGERS.keys():
+            return
+        for name, body in SQLITE_TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+        cursor.execute(
+            'INSERT INTO recipes_recipe_fts (recipes_recipe_fts) '
+            "VALUES ('rebuild')"
+        )
+
+
+def fts_query(value):
+    """Запрос FTS5: все слова обязательны, каждое ищется как префикс."""
+    return ' '.join(f'"{word}"*' for word in WORD.findall(value.lower()))
+
+
+def search_recipes(queryset, value):
+    """
+    Отбор рецептов по словам из названия и описания с ранжированием.
+
+    На PostgreSQL используется столбец search_vector с русской
+    морфологией и индексом GIN, на SQLite — таблица FTS5
+    recipes_recipe_fts. Обе поддерживаются триггерами базы, поэтому
+    учитывают и массовые загрузки. Прочие базы ищут через icontains.
+    Результаты упорядочены по релевантности, затем по дате.
+    """
+    if connection.vendor == 'postgresql':
+        match, rank, params = POSTGRES_MATCH, POSTGRES_RANK, (value,)
+    elif connection.vendor == 'sqlite':
+        query = fts_query(value)
+        if not query:
+            return queryset
+        match, rank, params = SQLITE_MATCH, SQLITE_RANK, (query,)
+    else:
+        return queryset.filter(
+            Q(name__icontains=value) | Q(text__icontains=value)
+        )
+    return queryset.filter(
+        RawSQL(match, params, output_field=BooleanField()),
+    ).annotate(
+        search_rank=RawSQL(rank, params, output_field=FloatField()),
+    ).order_by('-search_rank', '-pub_date', '-id')
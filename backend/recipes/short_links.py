@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from api.cache import cache_is_shared, get_data_version
+from foodgram.constants import (SHORT_LINK_CACHE_SIZE, SHORT_LINK_NEGATIVE_TTL,
+                                UUID_MAX_LENGTH)
+from recipes.models import Recipe
+
+
+class ShortLinkResolver:
+    """
+    Поиск рецепта по короткому коду с кэшем в памяти процесса.
+
+    Найденные коды хранятся в LRU ограниченного размера, ненайденные —
+    в отдельном LRU на SHORT_LINK_NEGATIVE_TTL секунд, чтобы повторные
+    запросы несуществующих ссылок не доходили до базы. При удалении
+    рецептов меняется версия коротких ссылок, и кэш сбрасывается. Без
+    общего кэша смену версии видно не во всех процессах, поэтому кэш
+    тогда не используется.
+    """
+
+    def __init__(self, max_size=SHORT_LINK_CACHE_SIZE):
+        self.max_size = max_size
+        self.lock = Lock()
+        self.version = None
+        self.found = OrderedDict()
+        self.missing = OrderedDict()
+
+    def _remember(self, entries, short_code, value):
+        entries[short_code] = value
+        entries.move_to_end(short_code)
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    def _lookup(self, short_code):
+        version = get_data_version('short-links')
+        if self.version != version:
+            self.found.clear()
+            self.missing.clear()
+            self.version = version
+        if short_code in self.found:
+            self.found.move_to_end(short_code)
+            return self.found[short_code], True
+        expires = self.missing.get(short_code)
+        if expires is not None and expires > monotonic():
+            return None, True
+        return None, False
+
+    def _query(self, short_code):
+        return Recipe.objects.filter(
+            short_code=short_code,
+        ).values_list('pk', flat=True).first()
+
+    def resolve(self, short_code):
+        """Id рецепта по короткому коду или None."""
+        if len(short_code) > UUID_MAX_LENGTH:
+            return None
+        if not cache_is_shared():
+            return self._query(short_code)
+        with self.lock:
+            recipe_id, cached = self._lookup(short_code)
+        if cached:
+            return recipe_id
+
+        recipe_id = self._query(short_code)
+        with self.lock:
+            if recipe_id is None:
+                self._remember(
+                    self.missing,
+                    short_code,
+                    monotonic() + SHORT_LINK_NEGATIVE_TTL,
+                )
+            else:
+                self._remember(self.found, short_code, recipe_id)
+        return recipe_id
+
+
+short_link_resolver = ShortLinkResolver()
@@ -0,0 +1,82 @@
+import random
+from array import array
+from hashlib import md5
+from heapq import nlargest
+
+from foodgram.constants import LSH_BANDS, MINHASH_PERMUTATIONS
+
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Зерно фиксировано: подписи, посчитанные в разных запусках,
+# должны оставаться сравнимыми.
+_random = random.Random(5021)
+PERMUTATIONS = [
+    (
+        _random.randrange(1, MERSENNE_PRIME),
+        _random.randrange(0, MERSENNE_PRIME),
+    )
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+
+
+def ingredient_feature(ingredient_id):
+    return ingredient_id * 2
+
+
+def tag_feature(tag_id):
+    return tag_id * 2 + 1
+
+
+def features_hash(features):
+    return md5(
+        ','.join(map(str, sorted(features))).encode()
+    ).hexdigest()
+
+
+def minhash(features):
+    """Подпись MinHash набора признаков в виде байтов."""
+    return array('Q', (
+        min((a * feature + b) % MERSENNE_PRIME for feature in features)
+        for a, b in PERMUTATIONS
+    )).tobytes()
+
+
+def minhash_many(items):
+    """Подписи для списка пар (id рецепта, признаки)."""
+    return [(recipe_id, minhash(features)) for recipe_id, features in items]
+
+
+def lsh_keys(signature):
+    """Ключи корзин LSH: подпись, разрезанная на LSH_BANDS полос."""
+    size = len(signature) // LSH_BANDS
+    return [
+        (band, signature[band * size:(band + 1) * size])
+        for band in range(LSH_BANDS)
+    ]
+
+
+def jaccard(first, second):
+    return len(first & second) / len(first | second)
+
+
+def score_many(tasks, count):
+    """
+    Лучшие соседи для пачки рецептов.
+
+    tasks — список (id рецепта, признаки, [(id кандидата, признаки)]).
+    Возвращает список (id рецепта, [(id соседа, сходство)]).
+    """
+    return [
+        (
+            recipe_id,
+            [
+                (candidate_id, score)
+                for score, candidate_id in nlargest(count, (
+                    (jaccard(features, candidate_features), candidate_id)
+                    for candidate_id, candidate_features in candidates
+                ))
+                if score > 0
+            ],
+        )
+        for recipe_id, features, candidates in tasks
+    ]
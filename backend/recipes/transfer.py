@@ -0,0 +1,375 @@
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils.dateparse import parse_datetime
+
+from api.cache import bump_data_version
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+
+def recipe_to_record(recipe):
+    """Запись JSONL для рецепта: связи описаны естественными ключами."""
+    author = recipe.author
+    return {
+        'short_code': recipe.short_code,
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'pub_date': recipe.pub_date.isoformat(),
+        'image': recipe.image.name,
+        'author': {
+            'email': author.email,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+        },
+        'tags': [
+            {'name': tag.name, 'slug': tag.slug} for tag in recipe.tags.all()
+        ],
+        'ingredients': [
+            {
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.ingredients.all()
+        ],
+    }
+
+
+def iter_recipe_records(batch_size):
+    """
+    Выдаёт записи всех рецептов, читая базу пачками по первичному ключу.
+
+    В памяти одновременно находится не больше batch_size рецептов.
+    """
+    last_pk = 0
+    while True:
+        batch = list(
+            Recipe.objects
+            .filter(pk__gt=last_pk)
+            .order_by('pk')
+            .select_related('author')
+            .prefetch_related('tags', 'ingredients__ingredient')[:batch_size]
+        )
+        if not batch:
+            return
+        for recipe in batch:
+            yield recipe_to_record(recipe)
+        last_pk = batch[-1].pk
+
+
+def ensure_objects(model, key_fields, rows):
+    """
+    Находит объекты по естественному ключу, создавая недостающие.
+
+    rows — словарь {ключ: поля объекта}. Возвращает {ключ: pk} и
+    число созданных объектов.
+    """
+    def key(values):
+        return tuple(values[name] for name in key_fields)
+
+    def existing():
+        found = {}
+        lookup = {f'{name}__in': {k[i] for k in rows}
+                  for i, name in enumerate(key_fields)}
+        for values in model.objects.filter(**lookup).values(
+            'pk', *key_fields,
+        ):
+            found[key(values)] = values['pk']
+        return found
+
+    found = existing()
+    missing = [model(**rows[k]) for k in rows.keys() - found.keys()]
+    if not missing:
+        return found, 0
+    model.objects.bulk_create(missing, ignore_conflicts=True)
+    return existing(), len(missing)
+
+
+class RecipeImporter:
+    """
+    Загрузка рецептов из записей JSONL пачками.
+
+    Авторы, теги и ингредиенты ищутся по естественным ключам и при
+    необходимости создаются, рецепты и их связи пишутся bulk_create.
+    Рецепты с уже существующим коротким кодом пропускаются, поэтому
+    повторная загрузка того же файла ничего не дублирует.
+
+    Записи, которые нельзя загрузить без потери данных, не пишутся и
+    попадают в conflicts: повтор короткого кода в пачке, ингредиент,
+    указанный в рецепте дважды, и автор, чья почта или имя
+    пользователя уже заняты другим аккаунтом. Существующий аккаунт
+    используется, только если совпадают и почта, и имя пользователя.
+    """
+
+    def __init__(self, media_from=None, workers=0):
+        self.media_from = media_from
+        self.workers = workers
+        self.created = 0
+        self.skipped = 0
+        self.missing_images = 0
+        self.conflicts = []
+
+    def conflict(self, record, reason):
+        message = f'{record["short_code"]}: {reason}'
+        logger.warning('Рецепт не загружен, %s', message)
+        self.conflicts.append(message)
+
+    def copy_image(self, name):
+        """Копирует картинку в хранилище, возвращает (имя, найдена ли)."""
+        if not name or default_storage.exists(name):
+            return name, True
+        source = os.path.join(self.media_from, name)
+        if not os.path.exists(source):
+            logger.warning('Нет файла картинки %s', source)
+            return name, False
+        with open(source, 'rb') as file:
+            return default_storage.save(name, File(file)), True
+
+    def copy_images(self, records):
+        names = [record['image'] for record in records]
+        if not self.media_from:
+            return names
+        if self.workers:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(self.copy_image, names))
+        else:
+            results = [self.copy_image(name) for name in names]
+        self.missing_images += sum(not found for _, found in results)
+        return [name for name, _ in results]
+
+    def resolve_authors(self, records):
+        """
+        Находит и создаёт авторов, возвращает {(почта,): pk}.
+
+        Автор из файла совпадает с существующим аккаунтом, только если
+        у них одинаковы почта и имя пользователя. Если занято что-то
+        одно, записи автора отклоняются как конфликт.
+        """
+        rows = {
+            record['author']['email']: record['author'] for record in records
+        }
+        existing = User.objects.filter(
+            Q(email__in=rows)
+            | Q(username__in=[author['username'] for author in rows.values()])
+        ).values_list('email', 'username', 'pk')
+        by_email = {email: (username, pk) for email, username, pk in existing}
+        taken_usernames = {username for username, _ in by_email.values()}
+        authors = {}
+        rejected = {}
+        missing = []
+        for email, author in rows.items():
+            if email in by_email:
+                username, pk = by_email[email]
+                if username == author['username']:
+                    authors[(email,)] = pk
+                else:
+                    rejected[(email,)] = (
+                        f'почта {email} принадлежит пользователю {username}'
+                    )
+            elif author['username'] in taken_usernames:
+                rejected[(email,)] = (
+                    f'имя пользователя {author["username"]} занято '
+                    'другим аккаунтом'
+                )
+            else:
+                missing.append(User(**author, password=make_password(None)))
+        if missing:
+            User.objects.bulk_create(missing, ignore_conflicts=True)
+            authors.update(
+                ((email,), pk) for email, pk in User.objects.filter(
+                    email__in=[user.email for user in missing],
+                ).values_list('email', 'pk')
+            )
+        for record in records:
+            key = (record['author']['email'],)
+            if key in rejected:
+                self.conflict(record, rejected[key])
+            elif key not in authors:
+                self.conflict(record, 'автора не удалось создать')
+        return authors
+
+    def resolve_tags(self, records):
+        tags, created = ensure_objects(Tag, ('slug',), {
+            (tag['slug'],): tag
+            for record in records
+            for tag in record['tags']
+        })
+        if created:
+            bump_data_version('tags')
+        return tags
+
+    def resolve_ingredients(self, records):
+        ingredients, created = ensure_objects(
+            Ingredient,
+            ('name', 'measurement_unit'),
+            {
+                (item['name'], item['measurement_unit']): {
+                    'name': item['name'],
+                    'measurement_unit': item['measurement_unit'],
+                }
+                for record in records
+                for item in record['ingredients']
+            },
+        )
+        if created:
+            bump_data_version('ingredients')
+        return ingredients
+
+    def new_records(self, records):
+        known = set(
+            Recipe.objects.filter(
+                short_code__in=[record['short_code'] for record in records],
+            ).values_list('short_code', flat=True)
+        )
+        fresh = [
+            record for record in records if record['short_code'] not in known
+        ]
+        self.skipped += len(records) - len(fresh)
+        return self.valid_records(fresh)
+
+    def valid_records(self, records):
+        """
+        Отбрасывает записи, которые нарушили бы уникальность в базе.
+
+        Повтор тега в рецепте безвреден и просто убирается.
+        """
+        valid = []
+        seen = {'short_code': set(), 'email': {}, 'username': {}}
+        for record in records:
+            reason = self.record_conflict(record, seen)
+            if reason:
+                self.conflict(record, reason)
+                continue
+            author = record['author']
+            seen['short_code'].add(record['short_code'])
+            seen['email'][author['email']] = author['username']
+            seen['username'][author['username']] = author['email']
+            record['tags'] = list({
+                tag['slug']: tag for tag in record['tags']
+            }.values())
+            valid.append(record)
+        return valid
+
+    @staticmethod
+    def record_conflict(record, seen):
+        """Причина отклонить запись или None, если её можно загрузить."""
+        if record['short_code'] in seen['short_code']:
+            return 'короткий код уже встречался в файле'
+        ingredients = Counter(
+            (item['name'], item['measurement_unit'])
+            for item in record['ingredients']
+        )
+        repeated = [
+            f'{name} ({unit})'
+            for (name, unit), count in ingredients.items() if count > 1
+        ]
+        if repeated:
+            return f'ингредиент указан дважды: {", ".join(repeated)}'
+        email = record['author']['email']
+        username = record['author']['username']
+        if seen['email'].get(email, username) != username:
+            return (
+                f'почта {email} уже встречалась в файле у пользователя '
+                f'{seen["email"][email]}'
+            )
+        if seen['username'].get(username, email) != email:
+            return (
+                f'имя пользователя {username} уже встречалось в файле '
+                f'с почтой {seen["username"][username]}'
+            )
+        return None
+
+    def import_batch(self, records):
+        """Загружает пачку записей в одной транзакции."""
+        records = self.new_records(records)
+        if not records:
+            return
+        authors = self.resolve_authors(records)
+        records = [
+            record for record in records
+            if (record['author']['email'],) in authors
+        ]
+        if not records:
+            return
+        tags = self.resolve_tags(records)
+        ingredients = self.resolve_ingredients(records)
+        images = self.copy_images(records)
+
+        with transaction.atomic():
+            recipes = self.create_recipes(records, images, authors)
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(
+                    recipe_id=recipes[record['short_code']],
+                    tag_id=tags[(tag['slug'],)],
+                )
+                for record in records
+                for tag in record['tags']
+                if (tag['slug'],) in tags
+            ])
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(
+                    recipe_id=recipes[record['short_code']],
+                    ingredient_id=ingredients[
+                        (item['name'], item['measurement_unit'])
+                    ],
+                    amount=item['amount'],
+                )
+                for record in records
+                for item in record['ingredients']
+            ])
+            self.update_authors(records, authors)
+        self.created += len(records)
+
+    def create_recipes(self, records, images, authors):
+        """Создаёт рецепты и возвращает {короткий код: pk}."""
+        recipes = [
+            Recipe(
+                author_id=authors[(record['author']['email'],)],
+                name=record['name'],
+                text=record['text'],
+                cooking_time=record['cooking_time'],
+                image=image,
+                short_code=record['short_code'],
+            )
+            for record, image in zip(records, images)
+        ]
+        Recipe.objects.bulk_create(recipes)
+        pks = dict(
+            Recipe.objects.filter(
+                short_code__in=[recipe.short_code for recipe in recipes],
+            ).values_list('short_code', 'pk')
+        )
+        # auto_now_add подменяет дату при создании, возвращаем исходную.
+        for recipe, record in zip(recipes, records):
+            recipe.pk = pks[recipe.short_code]
+            recipe.pub_date = parse_datetime(record['pub_date'])
+        Recipe.objects.bulk_update(recipes, ['pub_date'])
+        return pks
+
+    def update_authors(self, records, authors):
+        added = Counter(
+            authors[(record['author']['email'],)] for record in records
+        )
+        User.objects.filter(pk__in=added).update(
+            recipes_count=F('recipes_count') + Case(
+                *[
+                    When(pk=author_id, then=Value(count))
+                    for author_id, count in added.items()
+                ],
+                default=Value(0),
+            ),
+        )
@@ -1,12 +1,18 @@
 from django.shortcuts import redirect
+from django.utils.cache import patch_cache_control
 
-from recipes.models import Recipe
+from foodgram.constants import SHORT_LINK_MAX_AGE, SHORT_LINK_NEGATIVE_TTL
+from recipes.short_links import short_link_resolver
 
 
 def redirect_short_link(request, short_code):
     """Перенаправление по короткой ссылке на рецепт."""
-    try:
-        recipe = Recipe.objects.get(short_code=short_code)
-        return redirect(f'/recipes/{recipe.pk}/')
-    except Recipe.DoesNotExist:
-        return redirect('/404/')
+    recipe_id = short_link_resolver.resolve(short_code)
+    if recipe_id is None:
+        response = redirect('/404/')
+        max_age = SHORT_LINK_NEGATIVE_TTL
+    else:
+        response = redirect(f'/recipes/{recipe_id}/')
+        max_age = SHORT_LINK_MAX_AGE
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
@@ -0,0 +1,39 @@
+import shutil
+import tempfile
+from uuid import uuid4
+
+from django.test import TestCase, override_settings
+
+
+class IsolatedTestCase(TestCase):
+    """
+    Тест со своими каталогом media и кэшем.
+
+    Картинки пишутся во временный каталог класса, который удаляется
+    после его тестов, а кэш живёт в памяти процесса под уникальным
+    именем, поэтому тесты не трогают кэш и файлы запущенного сервера.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.isolation = override_settings(
+            MEDIA_ROOT=cls.media_root,
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': f'tests-{uuid4().hex}',
+            }},
+        )
+        cls.isolation.enable()
+        try:
+            super().setUpClass()
+        except Exception:
+            cls.isolation.disable()
+            shutil.rmtree(cls.media_root, ignore_errors=True)
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.isolation.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
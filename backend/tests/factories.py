@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import Subscription
+
+User = get_user_model()
+
+IMAGE_NAME = 'recipes/images/test.png'
+
+
+def create_user(index):
+    return User.objects.create_user(
+        email=f'user{index}@example.com',
+        username=f'user{index}',
+        first_name='Имя',
+        last_name='Фамилия',
+        password='test-password-123',
+    )
+
+
+def create_catalog(tags=3, ingredients=5):
+    return (
+        [
+            Tag.objects.create(name=f'Тег {index}', slug=f'tag{index}')
+            for index in range(tags)
+        ],
+        [
+            Ingredient.objects.create(
+                name=f'Ингредиент {index}',
+                measurement_unit='г',
+            )
+            for index in range(ingredients)
+        ],
+    )
+
+
+def create_recipe(author, tags, ingredients, index=0):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=f'Рецепт {index}',
+        text='Описание',
+        cooking_time=10,
+        image=IMAGE_NAME,
+    )
+    recipe.tags.set(tags)
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+        for ingredient in ingredients
+    ])
+    return recipe
+
+
+def subscribe(user, author):
+    return Subscription.objects.create(user=user, author=author)
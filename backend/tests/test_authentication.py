@@ -0,0 +1,51 @@
+import tempfile
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from tests.base import IsolatedTestCase
+from tests.factories import create_user
+
+
+class CachedTokenAuthenticationTest(IsolatedTestCase):
+    """Токен кэшируется только в общем для процессов кэше."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.token = Token.objects.create(user=create_user(0))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def token_queries(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 200)
+        return [
+            query for query in queries.captured_queries
+            if 'authtoken_token' in query['sql']
+        ]
+
+    def test_shared_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CACHES={'default': {
+                'BACKEND': (
+                    'django.core.cache.backends.filebased.FileBasedCache'
+                ),
+                'LOCATION': directory,
+            }}):
+                self.assertEqual(self.token_queries(), [])
+                self.token.delete()
+                response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_per_process_cache(self):
+        self.assertEqual(len(self.token_queries()), 1)
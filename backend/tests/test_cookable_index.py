@@ -0,0 +1,42 @@
+from api.cookable_index import CookableIndex
+from tests.base import IsolatedTestCase
+from tests.factories import create_catalog, create_recipe, create_user
+
+
+class CookableIndexTest(IsolatedTestCase):
+    """Перестройка индекса не блокирует поиск."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(0)
+        cls.tags, cls.ingredients = create_catalog(ingredients=2)
+
+    def setUp(self):
+        self.index = CookableIndex()
+        self.first = create_recipe(self.author, self.tags, self.ingredients)
+
+    def search(self):
+        return [
+            recipe_id for recipe_id, _, _ in self.index.search(
+                [ingredient.pk for ingredient in self.ingredients],
+                limit=10,
+            )
+        ]
+
+    def test_new_rows_added(self):
+        self.assertEqual(self.search(), [self.first.pk])
+        second = create_recipe(
+            self.author,
+            self.tags,
+            self.ingredients,
+            index=1,
+        )
+        self.assertEqual(self.search(), [second.pk, self.first.pk])
+
+    def test_search_during_rebuild(self):
+        recipe_id = self.first.pk
+        self.assertEqual(self.search(), [recipe_id])
+        self.first.delete()
+        with self.index.build_lock:
+            self.assertEqual(self.search(), [recipe_id])
+        self.assertEqual(self.search(), [])
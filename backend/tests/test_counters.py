@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from tests.base import IsolatedTestCase
+from tests.factories import (create_catalog, create_recipe, create_user,
+                             subscribe)
+
+User = get_user_model()
+
+
+class CounterTest(IsolatedTestCase):
+    """Счётчики ведутся при любом способе создания и удаления."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(0)
+        cls.user = create_user(1)
+        cls.tags, cls.ingredients = create_catalog()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+        self.recipe = create_recipe(self.author, self.tags, self.ingredients)
+
+    def counters(self):
+        self.author.refresh_from_db()
+        return self.author.recipes_count, self.author.subscribers_count
+
+    def test_delete_orm_recipe(self):
+        self.assertEqual(self.counters(), (1, 0))
+        response = self.client.delete(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counters(), (0, 0))
+
+    def test_delete_with_stale_counter(self):
+        User.objects.filter(pk=self.author.pk).update(recipes_count=0)
+        response = self.client.delete(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counters(), (0, 0))
+
+    def test_relations(self):
+        for model in (Favorite, ShoppingCart):
+            relation = model.objects.create(
+                user=self.user,
+                recipe=self.recipe,
+            )
+            self.assertEqual(
+                Recipe.objects.values_list(model.counter_field, flat=True)
+                .get(pk=self.recipe.pk),
+                1,
+            )
+            relation.delete()
+            self.assertEqual(
+                Recipe.objects.values_list(model.counter_field, flat=True)
+                .get(pk=self.recipe.pk),
+                0,
+            )
+
+    def test_subscriptions(self):
+        subscription = subscribe(self.user, self.author)
+        self.assertEqual(self.counters(), (1, 1))
+        subscription.delete()
+        self.assertEqual(self.counters(), (1, 0))
+        subscribe(self.user, self.author)
+        self.user.delete()
+        self.assertEqual(self.counters(), (1, 0))
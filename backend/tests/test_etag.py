@@ -0,0 +1,44 @@
+import tempfile
+
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from tests.base import IsolatedTestCase
+from tests.factories import create_catalog
+
+PER_PROCESS_CACHE = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}}
+
+
+class DataVersionEtagTest(IsolatedTestCase):
+    """ETag справочников выдаётся только при общем кэше."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_shared_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CACHES={'default': {
+                'BACKEND': (
+                    'django.core.cache.backends.filebased.FileBasedCache'
+                ),
+                'LOCATION': directory,
+            }}):
+                etag = self.client.get('/api/tags/')['ETag']
+                response = self.client.get(
+                    '/api/tags/',
+                    HTTP_IF_NONE_MATCH=etag,
+                )
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(CACHES=PER_PROCESS_CACHE)
+    def test_per_process_cache(self):
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertEqual(len(response.data), 3)
@@ -0,0 +1,45 @@
+from unittest import mock
+
+from recipes.models import FeedEntry
+from tests.base import IsolatedTestCase
+from tests.factories import (create_catalog, create_recipe, create_user,
+                             subscribe)
+
+
+@mock.patch('recipes.models.FEED_FANOUT_MAX_SUBSCRIBERS', 1)
+class FeedThresholdTest(IsolatedTestCase):
+    """Рецепты автора не пропадают из лент при смене режима рассылки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(0)
+        cls.reader = create_user(1)
+        cls.other = create_user(2)
+        cls.tags, cls.ingredients = create_catalog()
+
+    def feed(self):
+        return FeedEntry.objects.recipe_ids(self.reader, None, 10)
+
+    def test_author_drops_below_threshold(self):
+        subscribe(self.reader, self.author)
+        subscription = subscribe(self.other, self.author)
+        recipe = create_recipe(self.author, self.tags, self.ingredients)
+        self.assertEqual(FeedEntry.objects.fan_out(recipe.pk), 0)
+        self.assertEqual(self.feed(), [recipe.pk])
+
+        subscription.delete()
+        self.assertEqual(self.feed(), [recipe.pk])
+        second = create_recipe(
+            self.author,
+            self.tags,
+            self.ingredients,
+            index=1,
+        )
+        self.assertEqual(FeedEntry.objects.fan_out(second.pk), 0)
+        self.assertEqual(self.feed(), [second.pk, recipe.pk])
+
+    def test_small_author(self):
+        subscribe(self.reader, self.author)
+        recipe = create_recipe(self.author, self.tags, self.ingredients)
+        self.assertEqual(FeedEntry.objects.fan_out(recipe.pk), 1)
+        self.assertEqual(self.feed(), [recipe.pk])
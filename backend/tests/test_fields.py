@@ -0,0 +1,46 @@
+import base64
+import os
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from api.fields import StreamingBase64ImageField
+
+
+class StreamingBase64ImageFieldTest(SimpleTestCase):
+    """Картинка в base64 декодируется частями без потерь."""
+
+    def setUp(self):
+        buffer = BytesIO()
+        Image.frombytes('RGB', (200, 200), os.urandom(200 * 200 * 3)).save(
+            buffer,
+            'PNG',
+        )
+        self.content = buffer.getvalue()
+
+    def decode(self, data):
+        upload = StreamingBase64ImageField().to_internal_value(
+            f'data:image/png;base64,{data}'
+        )
+        upload.seek(0)
+        return upload.read()
+
+    def test_plain(self):
+        self.assertEqual(
+            self.decode(base64.b64encode(self.content).decode()),
+            self.content,
+        )
+
+    def test_wrapped_lines(self):
+        self.assertEqual(
+            self.decode(base64.encodebytes(self.content).decode()),
+            self.content,
+        )
+        self.assertEqual(
+            self.decode(
+                base64.encodebytes(self.content).decode()
+                .replace('\n', '\r\n')
+            ),
+            self.content,
+        )
@@ -0,0 +1,34 @@
+from unittest import mock
+
+from api.filters import RecipeFilter
+from recipes.models import Recipe
+from tests.base import IsolatedTestCase
+from tests.factories import create_catalog, create_recipe, create_user
+
+
+class RecipeTagFilterTest(IsolatedTestCase):
+    """Фильтр по тегам не падает на слагах, пропавших после проверки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags, cls.ingredients = create_catalog()
+        cls.recipe = create_recipe(
+            create_user(0),
+            cls.tags[:1],
+            cls.ingredients,
+        )
+
+    def filter_tags(self, slugs):
+        return list(RecipeFilter().filter_tags(
+            Recipe.objects.all(),
+            'tags',
+            slugs,
+        ))
+
+    def test_unknown_slug(self):
+        with mock.patch(
+            'api.filters.get_tag_ids_by_slug',
+            return_value={'tag0': self.tags[0].pk},
+        ):
+            self.assertEqual(self.filter_tags(['tag0', 'tag1']), [self.recipe])
+            self.assertEqual(self.filter_tags(['tag1']), [])
@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage
+from rest_framework.test import APIClient
+
+from tests.base import IsolatedTestCase
+from tests.factories import (IMAGE_NAME, create_catalog, create_recipe,
+                             create_user)
+
+
+class ImageVariantsTest(IsolatedTestCase):
+    """Готовность копий картинок хранится в модели."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(0)
+        cls.tags, cls.ingredients = create_catalog()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.recipe = create_recipe(self.author, self.tags, self.ingredients)
+
+    def test_serialization_skips_storage(self):
+        self.recipe.image_variants_for = IMAGE_NAME
+        self.recipe.save(update_fields=['image_variants_for'])
+        with mock.patch.object(FileSystemStorage, 'exists') as exists:
+            response = self.client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['image_variants']), {
+            'card',
+            'detail',
+        })
+        exists.assert_not_called()
+
+    def test_variants_not_ready(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.data['image_variants'], {})
+
+    @mock.patch('api.signals.schedule_variants')
+    def test_profile_save_without_avatar(self, schedule_variants):
+        self.author.first_name = 'Другое имя'
+        self.author.save()
+        self.author.save()
+        schedule_variants.assert_not_called()
+        self.author.avatar = 'users/avatars/test.png'
+        self.author.save()
+        schedule_variants.assert_called_once()
@@ -0,0 +1,69 @@
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+
+from recipes.models import Ingredient
+from tests.base import IsolatedTestCase
+from tests.factories import create_catalog, create_recipe, create_user
+
+
+class ImportIngredientsTest(IsolatedTestCase):
+    """Импорт сверяет ингредиенты по названию и единице измерения."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags, cls.ingredients = create_catalog(ingredients=2)
+        create_recipe(create_user(0), cls.tags, cls.ingredients[:1])
+
+    def run_import(self, rows, **options):
+        with tempfile.NamedTemporaryFile(
+            'w',
+            suffix='.csv',
+            encoding='utf-8',
+        ) as file:
+            file.write('\n'.join(rows))
+            file.flush()
+            output = StringIO()
+            call_command(
+                'import_ingredients',
+                path=file.name,
+                stdout=output,
+                **options,
+            )
+        return output.getvalue()
+
+    def units(self, name):
+        return sorted(
+            Ingredient.objects.filter(name=name)
+            .values_list('measurement_unit', flat=True)
+        )
+
+    def test_same_name_other_unit(self):
+        output = self.run_import([
+            'Ингредиент 1,г',
+            'Ингредиент 1,шт',
+            'Ингредиент 1,шт',
+        ])
+        self.assertIn(
+            'добавлено 1, обновлено 0, без изменений 1, повторов 1, '
+            'конфликтов 0',
+            output,
+        )
+        self.assertEqual(self.units('Ингредиент 1'), ['г', 'шт'])
+
+    def test_unit_update(self):
+        output = self.run_import(['Ингредиент 1,кг'])
+        self.assertIn('добавлено 0, обновлено 1', output)
+        self.assertEqual(self.units('Ингредиент 1'), ['кг'])
+
+    def test_used_unit_is_kept(self):
+        for dry_run in (True, False):
+            output = self.run_import(['Ингредиент 0,кг'], dry_run=dry_run)
+            self.assertIn(
+                'добавлено 0, обновлено 0, без изменений 0, повторов 0, '
+                'конфликтов 1',
+                output,
+            )
+            self.assertIn('Ингредиент 0: г -> кг', output)
+        self.assertEqual(self.units('Ингредиент 0'), ['г'])
@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+
+from recipes.models import Recipe
+from recipes.transfer import RecipeImporter
+from tests.base import IsolatedTestCase
+from tests.factories import create_user
+
+User = get_user_model()
+
+
+def record(short_code, email='new@example.com', username='new',
+           ingredients=('соль',)):
+    return {
+        'short_code': short_code,
+        'name': f'Рецепт {short_code}',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'pub_date': '2024-01-01T00:00:00+00:00',
+        'image': '',
+        'author': {
+            'email': email,
+            'username': username,
+            'first_name': 'Имя',
+            'last_name': 'Фамилия',
+        },
+        'tags': [{'name': 'Обед', 'slug': 'lunch'}] * 2,
+        'ingredients': [
+            {'name': name, 'measurement_unit': 'г', 'amount': 5}
+            for name in ingredients
+        ],
+    }
+
+
+class ImportRecipesTest(IsolatedTestCase):
+    """Конфликтующие записи отклоняются явно, а не роняют пачку."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(0)
+
+    def setUp(self):
+        self.importer = RecipeImporter()
+
+    def import_batch(self, records):
+        with self.assertLogs('recipes.transfer', 'WARNING') as logs:
+            self.importer.import_batch(records)
+        return logs.output
+
+    def test_duplicates_in_batch(self):
+        logs = self.import_batch([
+            record('first'),
+            record('first'),
+            record('second', ingredients=('соль', 'соль')),
+        ])
+        self.assertEqual(len(logs), 2)
+        self.assertEqual(self.importer.created, 1)
+        recipe = Recipe.objects.get(short_code='first')
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertFalse(Recipe.objects.filter(short_code='second').exists())
+
+    def test_existing_user(self):
+        self.importer.import_batch([
+            record('same', self.user.email, self.user.username),
+        ])
+        for conflicting in (
+            record('taken-username', username=self.user.username),
+            record('taken-email', email=self.user.email),
+        ):
+            self.import_batch([conflicting])
+        self.assertEqual(len(self.importer.conflicts), 2)
+        self.assertEqual(
+            list(Recipe.objects.values_list('short_code', 'author')),
+            [('same', self.user.pk)],
+        )
+        self.assertEqual(User.objects.count(), 1)
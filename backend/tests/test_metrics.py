@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+from collections import Counter
+
+from django.test import SimpleTestCase, override_settings
+
+from api.metrics import MetricsRegistry
+
+DEAD_PID = 2 ** 22 + 1
+
+
+class MetricsArchiveTest(SimpleTestCase):
+    """Файлы завершившихся процессов переносятся в архив."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        override = override_settings(METRICS_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write(self, pid, count):
+        with open(
+            os.path.join(self.directory, f'{pid}.json'),
+            'w',
+            encoding='utf-8',
+        ) as file:
+            json.dump({
+                'endpoints': {},
+                'responses': {'recipes-list GET 200': count},
+            }, file)
+
+    def test_dead_process(self):
+        registry = MetricsRegistry()
+        self.write(DEAD_PID, 2)
+        self.write(os.getppid(), 3)
+        for _ in range(2):
+            _, responses = registry.collect()
+            self.assertEqual(
+                responses,
+                Counter({'recipes-list GET 200': 5}),
+            )
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted([
+            f'{os.getpid()}.json',
+            f'{os.getppid()}.json',
+            'archive.json',
+            'archive.lock',
+        ]))
+        self.write(DEAD_PID, 1)
+        _, responses = registry.collect()
+        self.assertEqual(responses, Counter({'recipes-list GET 200': 6}))
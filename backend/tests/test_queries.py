@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from tests.base import IsolatedTestCase
+from tests.factories import (create_catalog, create_recipe, create_user,
+                             subscribe)
+
+
+class QueryCountTest(IsolatedTestCase):
+    """Число запросов не должно расти вместе с числом строк."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(0)
+        cls.authors = [create_user(index) for index in range(1, 4)]
+        cls.tags, cls.ingredients = create_catalog()
+        for author in cls.authors:
+            subscribe(cls.user, author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.created = 0
+
+    def add_recipes(self, count):
+        for _ in range(count):
+            self.created += 1
+            self.last = create_recipe(
+                self.authors[self.created % len(self.authors)],
+                self.tags,
+                self.ingredients,
+                self.created,
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant(self, url_func):
+        self.add_recipes(2)
+        small = self.count_queries(url_func())
+        self.add_recipes(10)
+        self.assertEqual(self.count_queries(url_func()), small)
+
+    def test_recipe_list(self):
+        self.assert_constant(lambda: '/api/recipes/?limit=20')
+
+    def test_recipe_detail(self):
+        self.assert_constant(lambda: f'/api/recipes/{self.last.pk}/')
+
+    def test_subscriptions(self):
+        self.assert_constant(
+            lambda: '/api/users/subscriptions/?recipes_limit=5'
+        )
@@ -0,0 +1,86 @@
+from rest_framework.test import APIClient
+
+from recipes.models import ShoppingCart
+from tests.base import IsolatedTestCase
+from tests.factories import create_catalog, create_recipe, create_user
+
+SUMMARY_URL = '/api/recipes/shopping_cart_summary/'
+
+
+class ShoppingCartSummaryTest(IsolatedTestCase):
+    """Суммы списка покупок следуют за изменениями вне API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(0)
+        cls.user = create_user(1)
+        cls.tags, cls.ingredients = create_catalog(ingredients=3)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.first = create_recipe(self.author, self.tags, self.ingredients)
+        self.second = create_recipe(
+            self.author,
+            self.tags,
+            self.ingredients[:1],
+            index=1,
+        )
+        for recipe in (self.first, self.second):
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+
+    def summary(self):
+        response = self.client.get(SUMMARY_URL)
+        self.assertEqual(response.status_code, 200)
+        return {row['id']: row['amount'] for row in response.data}
+
+    def test_orm_cart(self):
+        self.assertEqual(self.summary(), {
+            self.ingredients[0].pk: 20,
+            self.ingredients[1].pk: 10,
+            self.ingredients[2].pk: 10,
+        })
+        ShoppingCart.objects.filter(recipe=self.second).delete()
+        self.assertEqual(self.summary(), {
+            ingredient.pk: 10 for ingredient in self.ingredients
+        })
+
+    def test_delete_recipe(self):
+        self.first.delete()
+        self.assertEqual(self.summary(), {self.ingredients[0].pk: 10})
+        self.second.delete()
+        self.assertEqual(self.summary(), {})
+
+    def test_delete_via_api(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f'/api/recipes/{self.second.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.summary(), {
+            ingredient.pk: 10 for ingredient in self.ingredients
+        })
+
+    def download(self, format):
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/',
+            {'format': format},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_download_text(self):
+        response, content = self.download('txt')
+        self.assertEqual(
+            response['Content-Type'],
+            'text/plain; charset=utf-8',
+        )
+        self.assertEqual(content.decode().splitlines(), [
+            'Ингредиент 0 (г) — 20',
+            'Ингредиент 1 (г) — 10',
+            'Ингредиент 2 (г) — 10',
+        ])
+
+    def test_download_pdf(self):
+        response, content = self.download('pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
@@ -0,0 +1,35 @@
+from array import array
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from foodgram.constants import MINHASH_PERMUTATIONS
+from recipes.management.commands.build_similar_recipes import Command
+
+
+def signature(shared):
+    """Подпись, совпадающая с нулевой в первых shared значениях."""
+    return array('Q', (
+        0 if position < shared else position + 1
+        for position in range(MINHASH_PERMUTATIONS)
+    )).tobytes()
+
+
+class CandidatesTest(SimpleTestCase):
+    """Кандидаты отбираются по числу совпавших полос LSH."""
+
+    @mock.patch(
+        'recipes.management.commands.build_similar_recipes'
+        '.SIMILAR_MAX_CANDIDATES',
+        3,
+    )
+    def test_most_collisions_first(self):
+        command = Command()
+        command.signatures = {
+            1: signature(MINHASH_PERMUTATIONS),
+            2: signature(MINHASH_PERMUTATIONS // 2),
+            3: signature(MINHASH_PERMUTATIONS // 4),
+            **{recipe_id: signature(2) for recipe_id in range(100, 110)},
+        }
+        command.build_buckets()
+        self.assertEqual(command.candidates(1), [2, 3, 109])
@@ -14,6 +14,7 @@ class UserAdmin(BaseUserAdmin):
     list_display = (
         'id', 'email', 'username',
         'first_name', 'last_name', 'is_staff',
+        'recipes_count', 'subscribers_count',
     )
     list_filter = ('is_staff', 'is_superuser', 'is_active')
     search_fields = (
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+# FEED_FANOUT_MAX_SUBSCRIBERS на момент миграции.
+FEED_FANOUT_MAX_SUBSCRIBERS = 10000
+
+
+def mark_pulled_authors(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    User.objects.filter(
+        subscribers_count__gt=FEED_FANOUT_MAX_SUBSCRIBERS,
+    ).update(feed_pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='feed_pulled',
+            field=models.BooleanField(default=False, editable=False, help_text='Ставится, когда у автора становится слишком много подписчиков. Ленты читают его рецепты из таблицы рецептов, даже если подписчиков потом станет меньше.', verbose_name='Рецепты не рассылаются в ленты'),
+        ),
+        migrations.RunPython(mark_pulled_authors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:08
+
+import posixpath
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+# Последняя создаваемая копия на момент миграции: по ней судили о
+# готовности копий до появления поля.
+LAST_VARIANT = 'medium.jpeg'
+
+
+def last_variant(name):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'variants', f'{stem}_{LAST_VARIANT}')
+
+
+def mark_ready(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    ready = []
+    for pk, name in User.objects.exclude(avatar='').exclude(
+        avatar__isnull=True,
+    ).values_list('pk', 'avatar').iterator():
+        if default_storage.exists(last_variant(name)):
+            ready.append(User(pk=pk, avatar_variants_for=name))
+    User.objects.bulk_update(ready, ['avatar_variants_for'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_feed_pulled'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_variants_for',
+            field=models.CharField(blank=True, editable=False, help_text='Путь аватара, для которого созданы уменьшенные копии.', max_length=100, verbose_name='Аватар с готовыми копиями'),
+        ),
+        migrations.RunPython(mark_ready, migrations.RunPython.noop),
+    ]
@@ -33,6 +33,33 @@ class User(AbstractUser):
         null=True,
         verbose_name='Аватар',
     )
+    avatar_variants_for = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name='Аватар с готовыми копиями',
+        help_text='Путь аватара, для которого созданы уменьшенные копии.',
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число рецептов',
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число подписчиков',
+    )
+    feed_pulled = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Рецепты не рассылаются в ленты',
+        help_text=(
+            'Ставится, когда у автора становится слишком много '
+            'подписчиков. Ленты читают его рецепты из таблицы рецептов, '
+            'даже если подписчиков потом станет меньше.'
+        ),
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']